@@ -0,0 +1,270 @@
+"""
+Admission control for the layout API.
+
+A fixed number of requests run at once; a bounded number more wait in a
+FIFO queue for a free slot. Requests that find the queue full, or that
+wait longer than the queue timeout, are shed right away with a 503 and a
+Retry-After header instead of piling up, so latency for admitted
+requests stays bounded when the service is overloaded.
+
+Handlers that never await (like the layout rules) run to completion in a
+single event-loop step, so their backlog builds up in the event loop
+rather than in the admission queue. The controller therefore also
+samples event-loop lag and sheds new requests while it exceeds the
+queue timeout.
+"""
+import os
+import math
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Iterable
+
+# Environment variables overriding the defaults below
+MAX_CONCURRENCY_ENV = "LAYOUT_MAX_CONCURRENCY"
+MAX_QUEUE_ENV = "LAYOUT_MAX_QUEUE"
+QUEUE_TIMEOUT_ENV = "LAYOUT_QUEUE_TIMEOUT"
+RETRY_AFTER_ENV = "LAYOUT_RETRY_AFTER"
+
+# Requests running at once
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get(MAX_CONCURRENCY_ENV) or 64)
+
+# Requests waiting for a slot before new arrivals are shed
+DEFAULT_MAX_QUEUE = int(os.environ.get(MAX_QUEUE_ENV) or 256)
+
+# Seconds a request may wait for a slot before it is shed
+DEFAULT_QUEUE_TIMEOUT = float(os.environ.get(QUEUE_TIMEOUT_ENV) or 0.1)
+
+# Seconds clients are told to wait before retrying a shed request
+DEFAULT_RETRY_AFTER = float(os.environ.get(RETRY_AFTER_ENV) or 1)
+
+# Seconds between event-loop lag samples
+LAG_SAMPLE_INTERVAL = 0.01
+
+# Paths that bypass admission control, so the service can be observed under overload
+DEFAULT_EXEMPT_PATHS = ("/metrics",)
+
+_OVERLOADED_BODY = b'{"detail":"Service overloaded, retry later"}'
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded, time-limited wait queue.
+
+    Must be used from one event loop at a time; lag sampling restarts when
+    requests start arriving on a different loop. A freed slot is handed directly
+    to the oldest waiter, so queued requests are served in arrival order
+    and new arrivals cannot overtake them.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+        retry_after: float = DEFAULT_RETRY_AFTER,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrency: Requests allowed to run at once
+            max_queue: Requests allowed to wait for a slot (0 to shed as soon as all slots are busy)
+            queue_timeout: Seconds a request may wait before it is shed
+            retry_after: Seconds sent in the Retry-After header of shed requests
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.loop_lag = 0.0
+        self._next_sample = 0.0
+        self._sample_loop = None
+
+        # Counters since startup
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+    @property
+    def waiting(self) -> int:
+        """Requests currently waiting for a slot."""
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a slot.
+
+        Returns:
+            True if the request was admitted (call release() when it is done),
+            False if it was shed
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._sample_loop:
+            # First request, or the previous loop is gone (e.g. TestClient without "with")
+            self._sample_loop = loop
+            self.loop_lag = 0.0
+            self._sample_lag(loop.time())
+
+        # Requests behind an overloaded loop have already waited about this
+        # long; an overdue sample means the loop is falling behind right now
+        if max(self.loop_lag, loop.time() - self._next_sample) > self.queue_timeout:
+            self.shed += 1
+            return False
+
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            return False
+
+        future = loop.create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        timer = loop.call_later(self.queue_timeout, self._expire, future)
+        try:
+            granted = await future
+        except asyncio.CancelledError:
+            # The client went away; give back a slot handed over in the meantime
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            else:
+                self._remove(future)
+            raise
+        finally:
+            timer.cancel()
+
+        if granted:
+            self.admitted += 1
+        else:
+            self.shed += 1
+        return granted
+
+    def release(self):
+        """Free the slot of a finished request, handing it to the oldest waiter."""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+    def _sample_lag(self, scheduled: float):
+        """Measure how late this callback ran, then schedule the next sample."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._sample_loop:
+            return  # Left over from a loop the controller no longer serves
+        now = loop.time()
+        self.loop_lag = max(0.0, now - scheduled)
+        self._next_sample = now + LAG_SAMPLE_INTERVAL
+        loop.call_at(self._next_sample, self._sample_lag, self._next_sample)
+
+    def _expire(self, future: asyncio.Future):
+        if not future.done():
+            self._remove(future)
+            future.set_result(False)
+
+    def _remove(self, future: asyncio.Future):
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Current counters and gauges.
+
+        Returns:
+            Mapping with admitted, queued and shed totals, active and waiting
+            requests, and the last event-loop lag sample
+        """
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "active": self.active,
+            "waiting": self.waiting,
+            "loop_lag_ms": int(self.loop_lag * 1000),
+        }
+
+    def render_metrics(self, prefix: str = "layout_admission") -> str:
+        """
+        The counters in the Prometheus text exposition format.
+
+        Args:
+            prefix: Metric name prefix
+
+        Returns:
+            The metrics page
+        """
+        metrics = [
+            ("admitted_total", "counter", "Requests admitted to a handler", self.admitted),
+            ("queued_total", "counter", "Requests that waited for a free slot", self.queued),
+            ("shed_total", "counter", "Requests rejected with 503", self.shed),
+            ("active", "gauge", "Requests currently running", self.active),
+            ("waiting", "gauge", "Requests currently waiting for a slot", self.waiting),
+            ("loop_lag_seconds", "gauge", "Last event-loop lag sample", self.loop_lag),
+            ("max_concurrency", "gauge", "Configured concurrency limit", self.max_concurrency),
+            ("max_queue", "gauge", "Configured queue depth", self.max_queue),
+        ]
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that runs every HTTP request through an AdmissionController."""
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        exempt_paths: Iterable[str] = DEFAULT_EXEMPT_PATHS,
+    ):
+        """
+        Wrap an ASGI application.
+
+        Args:
+            app: The application to protect
+            controller: Shared admission state
+            exempt_paths: Request paths that are never queued or shed
+        """
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = frozenset(exempt_paths)
+        self._retry_after = str(max(1, math.ceil(controller.retry_after))).encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire():
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send):
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(_OVERLOADED_BODY)).encode()),
+                (b"retry-after", self._retry_after),
+            ],
+        })
+        await send({"type": "http.response.body", "body": _OVERLOADED_BODY})
@@ -0,0 +1,237 @@
+"""
+Crash-safe writes of downloaded media.
+
+Downloads are written to a hidden temporary file next to their final
+path, with the expected size preallocated up front so the filesystem can
+lay the file out contiguously, and moved into place with an atomic
+rename once complete. A half-finished download therefore never shows up
+under the final name, and a full disk fails at the start instead of
+near the end.
+"""
+import os
+import re
+import errno
+import secrets
+from typing import Optional, Tuple
+
+# Environment variables overriding the write buffer size and fsync policy
+WRITE_BUFFER_ENV = "DOWNLOAD_WRITE_BUFFER"
+FSYNC_ENV = "DOWNLOAD_FSYNC"
+
+# fsync policies: never sync, sync once on completion, or sync after every buffer's worth
+FSYNC_NEVER = "never"
+FSYNC_CLOSE = "close"
+FSYNC_ALWAYS = "always"
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_CLOSE, FSYNC_ALWAYS)
+
+# Userspace buffer in front of the file; downloads arrive in small chunks.
+# Much larger buffers were slower in bench_write.py (copies fall out of cache)
+DEFAULT_BUFFER_SIZE = int(os.environ.get(WRITE_BUFFER_ENV) or 256 * 1024)
+
+# Syncing is off unless asked for; the rename alone already hides partial files
+DEFAULT_FSYNC = os.environ.get(FSYNC_ENV) or FSYNC_NEVER
+if DEFAULT_FSYNC not in FSYNC_POLICIES:
+    raise ValueError(f"{FSYNC_ENV} must be one of {', '.join(FSYNC_POLICIES)}, not {DEFAULT_FSYNC!r}")
+
+# Longest file name (in bytes) produced by media_filename
+MAX_NAME_BYTES = 200
+
+# yt-dlp output template naming files the same way as media_filename
+YTDLP_FILENAME = '%(title)s [%(id)s.%(format_id)s].%(ext)s'
+
+# Characters that are invalid in file names on Windows, macOS or Linux
+_UNSAFE_CHARS_RE = re.compile(r'[\x00-\x1f<>:"/\\|?*]')
+
+# Preallocation errors meaning "not supported here", which are not fatal
+_NO_PREALLOCATE = (errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS)
+
+# Flush file data without forcing a metadata update where the platform allows it
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+# Flags for creating a temporary file that must not exist yet
+_TEMP_FLAGS = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+
+
+def media_filename(title: str, video_id: str, format_id, ext: str) -> str:
+    """
+    Build a safe file name that stays unique across videos sharing a title
+    and across formats of the same video.
+
+    Args:
+        title: The video title
+        video_id: The YouTube video id
+        format_id: The yt-dlp format id or pytube itag
+        ext: File extension without the dot
+
+    Returns:
+        A name like "Title [dQw4w9WgXcQ.140].m4a"
+    """
+    title = _UNSAFE_CHARS_RE.sub("_", title).strip().rstrip(".") or "video"
+    suffix = _UNSAFE_CHARS_RE.sub("_", f" [{video_id}.{format_id}].{ext}")
+    budget = MAX_NAME_BYTES - len(suffix.encode("utf-8"))
+    title = title.encode("utf-8")[:budget].decode("utf-8", "ignore").rstrip()
+    return f"{title}{suffix}"
+
+
+def create_temp(path: str) -> Tuple[int, str]:
+    """
+    Create the hidden temporary file a write to path goes through.
+
+    The extension is kept last, so tools that pick a format from it (such
+    as ffmpeg) still work on the temporary name.
+
+    Args:
+        path: Final path of the file
+
+    Returns:
+        Tuple of (open file descriptor, temporary path)
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    base, ext = os.path.splitext(name)
+    while True:
+        temp_path = os.path.join(directory, f".{base}.{secrets.token_hex(4)}.part{ext}")
+        try:
+            # Created with the mode a finished file should have, under the process umask
+            return os.open(temp_path, _TEMP_FLAGS, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+def fsync_directory(directory: str):
+    """Persist a rename by syncing the directory that holds the file."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform (e.g. Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def sync_file(path: str, fsync: str = DEFAULT_FSYNC):
+    """
+    Apply the fsync policy to a file written by someone else (e.g. yt-dlp).
+
+    Args:
+        path: The completed file
+        fsync: One of FSYNC_POLICIES
+    """
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {fsync}")
+    if fsync == FSYNC_NEVER:
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class AtomicWriter:
+    """
+    A file that only appears at its final path once it is complete.
+
+    Use as a context manager: leaving the block normally commits the file,
+    leaving it with an exception removes the temporary file and leaves any
+    existing file at the final path untouched.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        expected_size: Optional[int] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        fsync: str = DEFAULT_FSYNC,
+    ):
+        """
+        Create the temporary file and preallocate it.
+
+        Args:
+            path: Final path of the file
+            expected_size: Bytes to preallocate (e.g. filesize or filesize_approx)
+            buffer_size: Bytes buffered in memory between writes to the file
+            fsync: One of FSYNC_POLICIES
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.path = path
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.bytes_written = 0
+        self._unsynced = 0
+
+        fd, self.temp_path = create_temp(path)
+        try:
+            if expected_size:
+                self._preallocate(fd, expected_size)
+            self._file = open(fd, "wb", buffering=buffer_size)
+        except BaseException:
+            os.close(fd)
+            os.remove(self.temp_path)
+            raise
+
+    @staticmethod
+    def _preallocate(fd: int, size: int):
+        if not hasattr(os, "posix_fallocate"):
+            return
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except OSError as e:
+            # ENOSPC and friends should fail the download now, not at 99%
+            if e.errno not in _NO_PREALLOCATE:
+                raise
+
+    def write(self, data: bytes):
+        """
+        Append data to the file.
+
+        Args:
+            data: The bytes to write
+        """
+        self._file.write(data)
+        self.bytes_written += len(data)
+        if self.fsync == FSYNC_ALWAYS:
+            self._unsynced += len(data)
+            if self._unsynced >= self.buffer_size:
+                self._file.flush()
+                _datasync(self._file.fileno())
+                self._unsynced = 0
+
+    def commit(self) -> str:
+        """
+        Finish the file and move it to its final path.
+
+        Returns:
+            The final path
+        """
+        self._file.flush()
+        # Drop preallocated space beyond what was actually written
+        os.ftruncate(self._file.fileno(), self.bytes_written)
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+        if self.fsync != FSYNC_NEVER:
+            fsync_directory(os.path.dirname(self.temp_path))
+        return self.path
+
+    def abort(self):
+        """Discard everything written so far."""
+        self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
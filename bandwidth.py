@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Environment variable holding the default process-wide limit in bytes/second
+RATE_LIMIT_ENV = "DOWNLOAD_RATE_LIMIT"
+
+# Length of the window used to measure a job's current throughput
+MEASURE_WINDOW = 1.0
+
+# Seconds without any bytes after which a job's share goes to the other jobs
+IDLE_AFTER = 0.5
+
+
+class BandwidthJob:
+    """
+    Handle for one download drawing from a BandwidthManager.
+
+    Use as a context manager, or call close() when the transfer ends.
+    """
+
+    def __init__(self, manager: "BandwidthManager", name: str, weight: float):
+        self.manager = manager
+        self.name = name
+        self.weight = weight
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.closed = False
+        # When bytes last moved (None until the first bytes), and whether the
+        # job is waiting for tokens right now; both count as being active
+        self._last_active: Optional[float] = None
+        self._waiting = False
+        # Per-job token bucket, refilled at this job's share of the total rate
+        self._tokens = 0.0
+        self._last_refill = self.started
+        # Throughput over the last completed measurement window
+        self._window_start = self.started
+        self._window_bytes = 0
+        self._current: Optional[float] = None
+
+    def consume(self, nbytes: int):
+        """
+        Account for nbytes transferred, blocking until they fit the limit.
+
+        Args:
+            nbytes: Number of bytes just read from the network
+        """
+        self.manager._consume(self, nbytes)
+
+    def close(self):
+        """Stop drawing from the manager and give the share back to other jobs."""
+        self.manager._unregister(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BandwidthManager:
+    """
+    Process-wide token bucket shared by all concurrent downloads.
+
+    The total rate is split between the active jobs in proportion to their
+    weights, so one large download cannot crowd out the others, and the sum
+    never exceeds the configured limit. Jobs that have not moved bytes for
+    IDLE_AFTER seconds (e.g. while still resolving metadata) are left out
+    of the split. The limit can be changed while downloads are running.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst_seconds: float = 0.25):
+        """
+        Initialize the manager.
+
+        Args:
+            rate: Total allowed throughput in bytes/second (None for unlimited)
+            burst_seconds: How many seconds worth of tokens a job may accumulate
+        """
+        self._cond = threading.Condition()
+        self._rate = rate
+        self._burst_seconds = burst_seconds
+        self._jobs: Dict[int, BandwidthJob] = {}
+
+    @property
+    def rate(self) -> Optional[float]:
+        """The current total limit in bytes/second (None for unlimited)."""
+        return self._rate
+
+    def set_rate(self, rate: Optional[float]):
+        """
+        Change the total limit at runtime.
+
+        Args:
+            rate: New throughput limit in bytes/second (None for unlimited)
+        """
+        with self._cond:
+            self._rate = rate
+            self._cond.notify_all()
+
+    def register(self, name: str, weight: float = 1.0) -> BandwidthJob:
+        """
+        Start accounting a new download.
+
+        Args:
+            name: Label used in reports
+            weight: Relative share of the total rate for this job
+
+        Returns:
+            The job handle to draw bytes from
+        """
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+
+        job = BandwidthJob(self, name, weight)
+        with self._cond:
+            self._jobs[id(job)] = job
+            self._cond.notify_all()
+        return job
+
+    def _unregister(self, job: BandwidthJob):
+        with self._cond:
+            job.closed = True
+            self._jobs.pop(id(job), None)
+            self._cond.notify_all()
+
+    def _is_active(self, job: BandwidthJob, now: float) -> bool:
+        return job._waiting or (job._last_active is not None and now - job._last_active < IDLE_AFTER)
+
+    def _share(self, job: BandwidthJob, now: float) -> Optional[float]:
+        """Allowed rate for job, counting it as active; caller must hold the lock."""
+        if self._rate is None:
+            return None
+        total_weight = job.weight + sum(
+            j.weight for j in self._jobs.values() if j is not job and self._is_active(j, now)
+        )
+        return self._rate * job.weight / total_weight
+
+    def _consume(self, job: BandwidthJob, nbytes: int):
+        with self._cond:
+            now = time.monotonic()
+            if not self._is_active(job, now):
+                # Coming back from idle (or starting): the refill starts now,
+                # and the other jobs' shares shrink
+                job._last_refill = now
+                self._cond.notify_all()
+            job._last_active = now
+            job.bytes += nbytes
+            job._tokens -= nbytes
+            job._window_bytes += nbytes
+
+            if now - job._window_start >= MEASURE_WINDOW:
+                job._current = job._window_bytes / (now - job._window_start)
+                job._window_start = now
+                job._window_bytes = 0
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    share = self._share(job, now)
+                    if share is None:
+                        job._tokens = 0.0
+                        job._last_refill = now
+                        return
+
+                    job._tokens = min(
+                        job._tokens + (now - job._last_refill) * share,
+                        share * self._burst_seconds,
+                    )
+                    job._last_refill = now
+                    if job._tokens >= 0 or job.closed:
+                        return
+
+                    # Sleep until the debt is paid off, but wake up early if the
+                    # rate or the set of jobs changes
+                    job._waiting = True
+                    self._cond.wait(-job._tokens / share)
+            finally:
+                job._waiting = False
+                job._last_active = time.monotonic()
+
+    def report(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Summarize actual versus allowed throughput for every registered job.
+
+        Returns:
+            Mapping of job name to bytes, actual and allowed bytes/second,
+            plus a "total" entry for the whole process. Actual throughput is
+            measured over the last MEASURE_WINDOW seconds of each job. An
+            idle job's allowed rate is what it would get if it resumed now.
+        """
+        now = time.monotonic()
+        with self._cond:
+            result = {}
+            total_actual = 0.0
+            total_bytes = 0
+            for job in self._jobs.values():
+                actual = job._current
+                if actual is None:
+                    actual = job.bytes / max(now - job.started, 1e-9)
+                total_actual += actual
+                total_bytes += job.bytes
+                result[job.name] = {
+                    "bytes": job.bytes,
+                    "actual": actual,
+                    "allowed": self._share(job, now),
+                }
+            result["total"] = {
+                "bytes": total_bytes,
+                "actual": total_actual,
+                "allowed": self._rate,
+            }
+            return result
+
+
+def _default_rate() -> Optional[float]:
+    value = os.environ.get(RATE_LIMIT_ENV)
+    return float(value) if value else None
+
+
+# Shared manager used by every download path in this process
+bandwidth_manager = BandwidthManager(rate=_default_rate())
@@ -0,0 +1,110 @@
+"""
+Compare download backends against a local HTTP fixture.
+
+Each backend downloads synthetic media of several sizes through its own
+HTTP path. Every run happens in a fresh process, so peak RSS and CPU time
+belong to that run alone. Reports time-to-first-byte, throughput, CPU
+seconds and peak RSS per backend and size.
+
+    python benchmarks/bench_backends.py --sizes 1M,16M,128M --repeat 3
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download_backends import BACKENDS, get_backend  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from http_pool import install_pytube  # noqa: E402
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def _parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def _run(backend_name, url, dest_path, results):
+    """Child process: one transfer, measured from the inside."""
+    backend = get_backend(backend_name)
+    if backend_name == "pytube":
+        install_pytube()  # As the applications do
+    first_byte = []
+
+    def progress(downloaded, total):
+        if downloaded and not first_byte:
+            first_byte.append(time.perf_counter())
+
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    backend.transfer(url, dest_path, progress)
+    elapsed = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    results.put({
+        "ttfb": (first_byte[0] - start) if first_byte else elapsed,
+        "elapsed": elapsed,
+        "bytes": os.path.getsize(dest_path),
+        "cpu": (usage.ru_utime - usage_before.ru_utime) + (usage.ru_stime - usage_before.ru_stime),
+        "rss": usage.ru_maxrss * rss_scale,
+    })
+
+
+def _available(name):
+    try:
+        get_backend(name)
+        return True
+    except ImportError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1M,16M,128M", help="comma-separated media sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    args = parser.parse_args()
+
+    sizes = [_parse_size(s) for s in args.sizes.split(",")]
+    names = [n for n in args.backends.split(",") if _available(n) or print(f"skipping {n}: not installed")]
+    context = multiprocessing.get_context("spawn")
+    workdir = tempfile.mkdtemp(prefix="bench_backends_")
+
+    print(f"{'backend':10} {'size':>8} {'ttfb ms':>9} {'MB/s':>9} {'cpu s':>7} {'peak RSS MB':>12}")
+    with FixtureServer() as server:
+        for size in sizes:
+            for name in names:
+                runs = []
+                for i in range(args.repeat):
+                    results = context.Queue()
+                    dest = os.path.join(workdir, f"{name}-{size}-{i}.bin")
+                    child = context.Process(target=_run, args=(name, server.url(size), dest, results))
+                    child.start()
+                    runs.append(results.get())
+                    child.join()
+                    os.remove(dest)
+                    assert runs[-1]["bytes"] == size, f"{name} wrote {runs[-1]['bytes']} of {size} bytes"
+
+                print(f"{name:10} {size / 1024 ** 2:>6.0f}MB"
+                      f" {statistics.median(r['ttfb'] for r in runs) * 1000:>9.1f}"
+                      f" {statistics.median(size / r['elapsed'] for r in runs) / 1e6:>9.1f}"
+                      f" {statistics.median(r['cpu'] for r in runs):>7.2f}"
+                      f" {max(r['rss'] for r in runs) / 1024 ** 2:>12.1f}")
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
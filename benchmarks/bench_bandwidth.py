@@ -0,0 +1,81 @@
+"""
+Check the shared bandwidth manager against a local HTTP fixture.
+
+Runs several weighted downloads at once, lowers the limit half way
+through, and prints actual versus allowed throughput for each job.
+
+    python benchmarks/bench_bandwidth.py --rate 4000000 --jobs 3
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bandwidth import BandwidthManager  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+
+
+def _download(manager, url, name, weight, results):
+    job = manager.register(name, weight)
+    start = time.monotonic()
+    total = 0
+    with job, urllib.request.urlopen(url) as response:
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                break
+            total += len(chunk)
+            job.consume(len(chunk))
+    results[name] = total / (time.monotonic() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=4_000_000, help="total limit in bytes/second")
+    parser.add_argument("--jobs", type=int, default=3)
+    parser.add_argument("--size", type=int, default=8_000_000, help="bytes per download")
+    args = parser.parse_args()
+
+    manager = BandwidthManager(rate=args.rate)
+    results = {}
+
+    with FixtureServer() as server:
+        threads = [
+            threading.Thread(
+                target=_download,
+                args=(manager, server.url(args.size), f"job{i} (w={i + 1})", i + 1, results),
+            )
+            for i in range(args.jobs)
+        ]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+
+        halved = False
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.5)
+            report = manager.report()
+            total = report["total"]
+            print(f"t={time.monotonic() - started:5.1f}s  actual={total['actual'] / 1e6:6.2f} MB/s"
+                  f"  allowed={(total['allowed'] or 0) / 1e6:6.2f} MB/s")
+            if not halved and time.monotonic() - started > 2:
+                manager.set_rate(args.rate / 2)
+                halved = True
+                print(f"-- limit lowered to {args.rate / 2 / 1e6:.2f} MB/s")
+
+        for t in threads:
+            t.join()
+
+    elapsed = time.monotonic() - started
+    print(f"\n{args.jobs * args.size / 1e6:.1f} MB in {elapsed:.1f}s "
+          f"({args.jobs * args.size / elapsed / 1e6:.2f} MB/s overall)")
+    for name, rate in sorted(results.items()):
+        print(f"{name}: {rate / 1e6:.2f} MB/s average")
+
+
+if __name__ == "__main__":
+    main()
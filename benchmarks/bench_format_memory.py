@@ -0,0 +1,147 @@
+"""
+Measure the memory held per queued video for the format list.
+
+Builds synthetic yt-dlp info dicts shaped like real YouTube extractions
+(signed URLs, HTTP headers, DASH fragments) and queues thousands of
+videos two ways: the previous layout, which kept the info dict and a
+dict with a pre-formatted display string per format, and compact
+FormatRecords with the info dict dropped. Retained memory is measured
+with tracemalloc.
+
+    python benchmarks/bench_format_memory.py --videos 5000
+"""
+import argparse
+import gc
+import os
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from format_records import format_human_size, formats_from_info  # noqa: E402
+
+# (format_id, ext, vcodec, acodec, width, height, note) of typical YouTube formats
+_FORMATS = [
+    ("18", "mp4", "avc1.42001E", "mp4a.40.2", 640, 360, "360p"),
+    ("22", "mp4", "avc1.64001F", "mp4a.40.2", 1280, 720, "720p"),
+    ("139", "m4a", "none", "mp4a.40.5", None, None, "low"),
+    ("140", "m4a", "none", "mp4a.40.2", None, None, "medium"),
+    ("249", "webm", "none", "opus", None, None, "low"),
+    ("251", "webm", "none", "opus", None, None, "medium"),
+] + [
+    (str(itag), ext, vcodec, "none", width, height, f"{height}p")
+    for itag, ext, vcodec, width, height in [
+        (160, "mp4", "avc1.4d400c", 256, 144), (133, "mp4", "avc1.4d4015", 426, 240),
+        (134, "mp4", "avc1.4d401e", 640, 360), (135, "mp4", "avc1.4d401f", 854, 480),
+        (136, "mp4", "avc1.64001f", 1280, 720), (137, "mp4", "avc1.640028", 1920, 1080),
+        (278, "webm", "vp9", 256, 144), (242, "webm", "vp9", 426, 240),
+        (243, "webm", "vp9", 640, 360), (244, "webm", "vp9", 854, 480),
+        (247, "webm", "vp9", 1280, 720), (248, "webm", "vp9", 1920, 1080),
+    ]
+]
+
+
+def _token(rng, length):
+    return "".join(rng.choices(string.ascii_letters + string.digits + "-_", k=length))
+
+
+def synthetic_info(rng, video_id):
+    """An info dict with the size and shape of a real yt-dlp extraction."""
+    expire = int(time.time()) + 6 * 3600
+    formats = []
+    for quality, (format_id, ext, vcodec, acodec, width, height, note) in enumerate(_FORMATS):
+        url = (f"https://rr{rng.randint(1, 9)}---sn-{_token(rng, 8)}.googlevideo.com/videoplayback"
+               f"?expire={expire}&ei={_token(rng, 20)}&ip=203.0.113.7&id=o-{_token(rng, 44)}"
+               f"&itag={format_id}&source=youtube&mime={ext}&sig={_token(rng, 120)}"
+               f"&lsig={_token(rng, 90)}&n={_token(rng, 16)}")
+        filesize = rng.randint(1 << 20, 1 << 30)
+        formats.append({
+            "format_id": format_id, "format_note": note, "ext": ext,
+            "vcodec": vcodec, "acodec": acodec, "width": width, "height": height,
+            "tbr": rng.uniform(50, 5000), "filesize": filesize, "quality": quality,
+            "url": url, "protocol": "https", "container": f"{ext}_dash",
+            "http_headers": {
+                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)",
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "en-us,en;q=0.5",
+                "Sec-Fetch-Mode": "navigate",
+            },
+            "downloader_options": {"http_chunk_size": 10485760},
+            "fragments": [{"url": f"{url}&range={i}", "duration": 5.0} for i in range(8)],
+        })
+    return {
+        "id": video_id, "title": f"Video {video_id}", "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hq.jpg",
+        "description": _token(rng, 2000), "tags": [_token(rng, 8) for _ in range(20)],
+        "formats": formats, "requested_formats": formats[-2:],
+    }
+
+
+def legacy_entry(info):
+    """The layout analyze_video used to keep: the info dict plus display dicts."""
+    video_formats = []
+    for f in info.get("formats", []):
+        if f.get("vcodec", "none") != "none" and f.get("acodec", "none") != "none":
+            file_size = format_human_size(f.get("filesize") or f.get("filesize_approx", 0))
+            name = f"{f.get('width', '?')}x{f.get('height', '?')} - {f.get('format_note', '')} ({f.get('ext', '?')}, {file_size})"
+            video_formats.append({"format_id": f["format_id"], "name": name, "quality": f.get("quality", 0)})
+    audio = [f for f in info["formats"] if f.get("vcodec", "") == "none" and f.get("acodec", "none") != "none"]
+    if audio:
+        best = max(audio, key=lambda x: x.get("quality", 0))
+        video_formats.append({
+            "format_id": best["format_id"],
+            "name": f"Audio only - {best.get('format_note', '')} ({best.get('ext', '?')})",
+            "quality": -1,
+        })
+    video_formats.sort(key=lambda x: x["quality"], reverse=True)
+    return info, video_formats
+
+
+def compact_entry(info):
+    """The current layout: compact records only."""
+    return formats_from_info(info)
+
+
+def measure(build, videos, seed):
+    """Queue videos built by build() and report retained bytes and build time."""
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    queue = []
+    for i in range(videos):
+        info = synthetic_info(rng, f"{i:011d}")
+        queue.append(build(info))
+        del info
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return queue, retained, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--videos", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'layout':8} {'videos':>7} {'retained MB':>12} {'per video KB':>13} {'peak MB':>9} {'build s':>8}")
+    for name, build in (("legacy", legacy_entry), ("compact", compact_entry)):
+        queue, retained, peak, elapsed = measure(build, args.videos, args.seed)
+        print(f"{name:8} {args.videos:>7} {retained / 1e6:>12.1f} {retained / args.videos / 1e3:>13.2f}"
+              f" {peak / 1e6:>9.1f} {elapsed:>8.2f}")
+        del queue
+
+    # Display text is only built for the video being shown
+    records = formats_from_info(synthetic_info(random.Random(args.seed), "00000000000"))
+    start = time.perf_counter()
+    for _ in range(1000):
+        names = [r.display_name for r in records]
+    print(f"display text for {len(names)} formats: {(time.perf_counter() - start) * 1e3:.1f} us per video")
+
+
+if __name__ == "__main__":
+    main()
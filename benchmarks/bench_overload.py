@@ -0,0 +1,227 @@
+"""
+Drive the layout API at twice its saturation rate, with and without admission control.
+
+The server runs main.app under uvicorn in a subprocess, with an extra
+route whose handler burns --work-ms of CPU on the event loop (standing in
+for heavier rule evaluation), so saturation is set by the server and not
+by this client. Saturation is measured first with a closed loop; then an
+open-loop client sends requests at 2x that rate on a fixed schedule.
+Latency is measured from each request's scheduled send time, so time
+spent waiting behind an overloaded server is included. Requires fastapi
+and uvicorn.
+
+    python benchmarks/bench_overload.py --work-ms 2 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_PATH = "/bench/work"
+
+_BODY = json.dumps({"app_purpose": "inventory with navigation", "features": ["Gallery", "details", "form"]})
+
+
+def serve(port, work_ms, admission):
+    """Subprocess entry point: main.app plus the CPU-bound benchmark route."""
+    sys.path.insert(0, ROOT)
+    import uvicorn
+    from main import LayoutRequest, app, generate_layout
+
+    if not admission:
+        app.user_middleware.clear()
+
+    @app.post(WORK_PATH)
+    async def work(data: LayoutRequest):
+        deadline = time.perf_counter() + work_ms / 1000
+        while time.perf_counter() < deadline:
+            pass
+        return await generate_layout(data)
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="error", access_log=False)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Server:
+    """Runs the server subprocess with the given admission settings."""
+
+    def __init__(self, work_ms, env=None):
+        self.port = _free_port()
+        self._args = [sys.executable, os.path.abspath(__file__), "--serve",
+                      "--port", str(self.port), "--work-ms", str(work_ms)]
+        if env is None:
+            self._args.append("--no-admission")
+        self._env = dict(os.environ, **(env or {}))
+
+    def __enter__(self):
+        self._process = subprocess.Popen(self._args, env=self._env)
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.2).close()
+                return self
+            except OSError:
+                time.sleep(0.1)
+        self._process.kill()
+        raise RuntimeError("server did not start")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._process.terminate()
+        self._process.wait()
+
+
+class _Connection:
+    """A keep-alive HTTP/1.1 connection sending the benchmark request."""
+
+    def __init__(self, reader, writer, request):
+        self.reader = reader
+        self.writer = writer
+        self.request = request
+
+    @classmethod
+    async def open(cls, port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        request = (f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(_BODY)}\r\n\r\n{_BODY}").encode()
+        return cls(reader, writer, request)
+
+    async def send(self):
+        """Send one request and return the response status."""
+        self.writer.write(self.request)
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        length = 0
+        for line in lines[1:]:
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        self.writer.close()
+
+
+async def closed_loop(port, path, connections, seconds):
+    """Requests per second with a fixed number of back-to-back clients."""
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal done
+        connection = await _Connection.open(port, path)
+        while time.perf_counter() < deadline:
+            await connection.send()
+            done += 1
+        connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return done / (time.perf_counter() - start)
+
+
+async def open_loop(port, path, rate, seconds, max_connections):
+    """Send at a fixed rate regardless of responses; return per-request results."""
+    idle = []
+    open_connections = 0
+    results = []
+    tasks = []
+
+    async def one(scheduled):
+        nonlocal open_connections
+        try:
+            if idle:
+                connection = idle.pop()
+            else:
+                open_connections += 1
+                connection = await _Connection.open(port, path)
+            status = await connection.send()
+            idle.append(connection)
+        except (OSError, asyncio.IncompleteReadError):
+            status = None
+            open_connections -= 1
+        results.append((status, time.perf_counter() - scheduled))
+
+    start = time.perf_counter()
+    total = int(rate * seconds)
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if not idle and open_connections >= max_connections:
+            results.append((None, 0.0))  # Client out of connections: count as failed
+            continue
+        tasks.append(asyncio.ensure_future(one(scheduled)))
+
+    await asyncio.gather(*tasks)
+    for connection in idle:
+        connection.close()
+    return results
+
+
+def _percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _report(name, results, seconds):
+    ok = [latency for status, latency in results if status == 200]
+    shed = [latency for status, latency in results if status == 503]
+    failed = sum(1 for status, _ in results if status not in (200, 503))
+    print(f"{name:10} {len(ok) / seconds:>8.0f} {len(shed) / max(1, len(results)) * 100:>7.1f}%"
+          f" {failed:>7} {_percentile(ok, 0.50) * 1000:>9.1f} {_percentile(ok, 0.99) * 1000:>9.1f}"
+          f" {max(ok, default=float('nan')) * 1000:>9.1f} {_percentile(shed, 0.99) * 1000:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--work-ms", type=float, default=2.0, help="CPU time per request on the server")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of overload per run")
+    parser.add_argument("--load", type=float, default=2.0, help="offered load as a multiple of saturation")
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--queue-timeout", type=float, default=0.1)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--no-admission", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.work_ms, not args.no_admission)
+        return
+
+    limited = {
+        "LAYOUT_MAX_CONCURRENCY": str(args.max_concurrency),
+        "LAYOUT_MAX_QUEUE": str(args.max_queue),
+        "LAYOUT_QUEUE_TIMEOUT": str(args.queue_timeout),
+    }
+
+    with _Server(args.work_ms) as server:
+        saturation = asyncio.run(closed_loop(server.port, WORK_PATH, 16, 3.0))
+    rate = saturation * args.load
+    print(f"saturation {saturation:.0f} req/s; offering {rate:.0f} req/s for {args.duration:.0f}s\n")
+
+    print(f"{'admission':10} {'ok/s':>8} {'shed':>8} {'failed':>7} {'p50 ms':>9} {'p99 ms':>9}"
+          f" {'max ms':>9} {'shed p99 ms':>12}")
+    for name, env in (("off", None), ("on", limited)):
+        with _Server(args.work_ms, env) as server:
+            results = asyncio.run(open_loop(server.port, WORK_PATH, rate, args.duration, args.max_connections))
+            _report(name, results, args.duration)
+
+
+if __name__ == "__main__":
+    main()
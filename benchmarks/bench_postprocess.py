@@ -0,0 +1,103 @@
+"""
+Compare serial and pipelined post-processing on locally generated media.
+
+Generates test videos with ffmpeg, "downloads" them from a local HTTP
+fixture, and extracts audio either inline on the download thread (serial)
+or through the PostProcessor pool so downloads overlap the encoding.
+Requires ffmpeg on PATH.
+
+    python benchmarks/bench_postprocess.py --items 6 --seconds 20
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bandwidth import BandwidthManager  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from postprocess import FFMPEG, PostProcessor, _run_stages  # noqa: E402
+
+STAGES = [("extract_audio", {"codec": "mp3"}), ("tag", {"metadata": {"title": "bench"}})]
+
+
+def _generate(path, seconds):
+    subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"testsrc=duration={seconds}:size=640x360:rate=30",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path],
+        check=True,
+    )
+
+
+def _download(manager, url, path):
+    with manager.register(path) as job, urllib.request.urlopen(url) as response, open(path, "wb") as f:
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                break
+            job.consume(len(chunk))
+            f.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=6)
+    parser.add_argument("--seconds", type=int, default=20, help="length of each generated video")
+    parser.add_argument("--rate", type=float, default=8_000_000, help="simulated link speed in bytes/second")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG) is None:
+        sys.exit(f"{FFMPEG} not found on PATH")
+
+    workdir = tempfile.mkdtemp(prefix="bench_postprocess_")
+    source = os.path.join(workdir, "source.mp4")
+    _generate(source, args.seconds)
+    with open(source, "rb") as f:
+        data = f.read()
+    print(f"Generated {len(data) / 1e6:.1f} MB test video")
+
+    manager = BandwidthManager(rate=args.rate)
+    with FixtureServer() as server:
+        url = server.add_file("source.mp4", data)
+
+        # Serial: process each item on the download thread before the next download
+        start = time.perf_counter()
+        for i in range(args.items):
+            path = os.path.join(workdir, f"serial{i}.mp4")
+            _download(manager, url, path)
+            _run_stages(path, STAGES)
+        serial = time.perf_counter() - start
+
+        # Pipelined: downloads feed the process pool through its queue
+        processor = PostProcessor(max_workers=args.workers, max_queued=args.workers)
+        start = time.perf_counter()
+        futures = []
+        for i in range(args.items):
+            path = os.path.join(workdir, f"pipelined{i}.mp4")
+            _download(manager, url, path)
+            futures.append(processor.submit(path, STAGES))
+        for future in futures:
+            future.result()
+        pipelined = time.perf_counter() - start
+        stats = processor.stats()
+        processor.shutdown()
+
+    print(f"serial:    {serial:6.2f}s")
+    print(f"pipelined: {pipelined:6.2f}s ({serial / pipelined:.2f}x)")
+    print("\nper-stage timings (pipelined):")
+    for stage, values in stats.items():
+        print(f"  {stage:14} n={values['count']:<3} mean={values['mean']:.3f}s max={values['max']:.3f}s")
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compare download-then-encode with streaming download-to-encoder.
+
+Generates a test audio file with ffmpeg, serves it from a local HTTP
+fixture at a simulated link speed, and measures end-to-end latency and
+bytes written to disk for both modes. Requires ffmpeg on PATH.
+
+    python benchmarks/bench_stream_encode.py --seconds 600 --codec mp3
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bandwidth import BandwidthManager  # noqa: E402
+from fixture_server import FixtureServer  # noqa: E402
+from postprocess import AUDIO_CODECS, FFMPEG, extract_audio  # noqa: E402
+from stream_encode import StreamingEncoder  # noqa: E402
+
+
+def _generate(path, seconds):
+    subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+         "-c:a", "libopus", "-b:a", "160k", path],
+        check=True,
+    )
+
+
+def _chunks(manager, url):
+    with manager.register(url) as job, urllib.request.urlopen(url) as response:
+        while True:
+            chunk = response.read(64 * 1024)
+            if not chunk:
+                return
+            job.consume(len(chunk))
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=600, help="length of the generated audio")
+    parser.add_argument("--codec", default="mp3", choices=sorted(AUDIO_CODECS))
+    parser.add_argument("--rate", type=float, default=2_000_000, help="simulated link speed in bytes/second")
+    args = parser.parse_args()
+
+    if shutil.which(FFMPEG) is None:
+        sys.exit(f"{FFMPEG} not found on PATH")
+
+    workdir = tempfile.mkdtemp(prefix="bench_stream_encode_")
+    source = os.path.join(workdir, "source.webm")
+    _generate(source, args.seconds)
+    with open(source, "rb") as f:
+        data = f.read()
+    print(f"Generated {len(data) / 1e6:.1f} MB of audio")
+
+    manager = BandwidthManager(rate=args.rate)
+    ext = AUDIO_CODECS[args.codec][1]
+    with FixtureServer() as server:
+        url = server.add_file("source.webm", data)
+
+        # Download to an intermediate file, then read it back to encode
+        start = time.perf_counter()
+        raw = os.path.join(workdir, "sequential.webm")
+        with open(raw, "wb") as f:
+            for chunk in _chunks(manager, url):
+                f.write(chunk)
+        encoded = extract_audio(raw, args.codec)
+        sequential = time.perf_counter() - start
+        sequential_written = os.path.getsize(raw) + os.path.getsize(encoded)
+
+        # Pipe chunks straight into the encoder
+        start = time.perf_counter()
+        output = os.path.join(workdir, f"streaming.{ext}")
+        with StreamingEncoder(output, args.codec) as encoder:
+            for chunk in _chunks(manager, url):
+                encoder.write(chunk)
+        streaming = time.perf_counter() - start
+        streaming_written = os.path.getsize(output)
+
+    print(f"download then encode: {sequential:6.2f}s, {sequential_written / 1e6:6.1f} MB written")
+    print(f"streaming encode:     {streaming:6.2f}s, {streaming_written / 1e6:6.1f} MB written")
+    print(f"latency saved: {sequential - streaming:.2f}s ({sequential / streaming:.2f}x)")
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measure write throughput of downloaded media on local disk.
+
+Writes synthetic media in download-sized chunks from one or more
+concurrent writers, either straight to the final path with default
+buffering (the previous write path) or through AtomicWriter with
+preallocation, a large write buffer and an atomic rename, under each
+fsync policy. Run it on the disk downloads actually go to.
+
+    python benchmarks/bench_write.py --dir ~/Downloads --size 256M --writers 1,4
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from atomic_write import FSYNC_POLICIES, AtomicWriter  # noqa: E402
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def _parse_size(text):
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def _write_direct(path, size, chunk, buffer_size, fsync):
+    with open(path, "wb") as f:
+        for offset in range(0, size, len(chunk)):
+            f.write(chunk[:size - offset])
+        if fsync != "never":
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _write_atomic(path, size, chunk, buffer_size, fsync):
+    with AtomicWriter(path, size, buffer_size=buffer_size, fsync=fsync) as f:
+        for offset in range(0, size, len(chunk)):
+            f.write(chunk[:size - offset])
+
+
+def _run(write, workdir, writers, size, chunk, buffer_size, fsync):
+    """Write one file per writer concurrently; return aggregate MB/s."""
+    paths = [os.path.join(workdir, f"video [{i:011d}].mp4") for i in range(writers)]
+    threads = [
+        threading.Thread(target=write, args=(path, size, chunk, buffer_size, fsync))
+        for path in paths
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for path in paths:
+        assert os.path.getsize(path) == size, f"{path} has {os.path.getsize(path)} of {size} bytes"
+        os.remove(path)
+    return writers * size / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dir", default=None, help="directory on the disk to test (default: temp dir)")
+    parser.add_argument("--size", default="256M", help="bytes per file")
+    parser.add_argument("--chunk", default="64K", help="size of each downloaded chunk")
+    parser.add_argument("--buffers", default="64K,256K,1M,4M", help="AtomicWriter buffer sizes")
+    parser.add_argument("--writers", default="1,4", help="comma-separated concurrent writer counts")
+    parser.add_argument("--fsync", default=",".join(FSYNC_POLICIES), help="fsync policies to test")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size = _parse_size(args.size)
+    chunk = os.urandom(_parse_size(args.chunk))
+    buffers = [_parse_size(b) for b in args.buffers.split(",")]
+    workdir = tempfile.mkdtemp(prefix="bench_write_", dir=args.dir)
+
+    cases = []
+    for fsync in args.fsync.split(","):
+        if fsync != "always":
+            cases.append(("direct", _write_direct, 0, fsync))
+        cases.extend(("atomic", _write_atomic, buffer_size, fsync) for buffer_size in buffers)
+
+    print(f"{'path':7} {'buffer':>8} {'fsync':>7} {'writers':>8} {'MB/s':>9}")
+    try:
+        for writers in (int(w) for w in args.writers.split(",")):
+            for name, write, buffer_size, fsync in cases:
+                rates = [
+                    _run(write, workdir, writers, size, chunk, buffer_size, fsync)
+                    for _ in range(args.repeat)
+                ]
+                buffer_label = f"{buffer_size // 1024}K" if buffer_size else "default"
+                print(f"{name:7} {buffer_label:>8} {fsync:>7} {writers:>8} {statistics.median(rates):>9.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Local HTTP server serving synthetic media for the benchmarks."""
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Block of bytes repeated to build every synthetic response body
+_PATTERN = bytes(range(256)) * 256
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """
+    Serves /media/<size>[.<ext>] as <size> bytes of synthetic data.
+
+    Supports both the HTTP Range header (yt-dlp) and the ``range=start-end``
+    query parameter pytube appends to stream URLs. Files placed in the
+    server's ``files`` mapping are served as-is under /files/<name>.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self) -> Optional[Tuple[int, bytes]]:
+        parsed = urlparse(self.path)
+        match = re.fullmatch(r"/media/(\d+)(?:\.\w+)?", parsed.path)
+        if match:
+            return int(match.group(1)), None
+        match = re.fullmatch(r"/files/(.+)", parsed.path)
+        if match and match.group(1) in self.server.files:
+            data = self.server.files[match.group(1)]
+            return len(data), data
+        return None
+
+    def _range(self, size: int) -> Tuple[int, int]:
+        query = parse_qs(urlparse(self.path).query)
+        spec = None
+        if "range" in query:
+            spec = query["range"][0]
+        elif self.headers.get("Range", "").startswith("bytes="):
+            spec = self.headers["Range"][len("bytes="):]
+        if not spec:
+            return 0, size - 1
+
+        start, _, end = spec.partition("-")
+        start = int(start or 0)
+        end = min(int(end), size - 1) if end else size - 1
+        return start, end
+
+    def _send(self, include_body: bool):
+        body = self._body()
+        if body is None:
+            self.send_error(404)
+            return
+
+        size, data = body
+        start, end = self._range(size)
+        partial = (start, end) != (0, size - 1) and "Range" in self.headers
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not include_body:
+            return
+
+        position = start
+        while position <= end:
+            if data is not None:
+                chunk = data[position:min(end + 1, position + len(_PATTERN))]
+            else:
+                offset = position % len(_PATTERN)
+                chunk = _PATTERN[offset:offset + min(end + 1 - position, len(_PATTERN) - offset)]
+            self.wfile.write(chunk)
+            position += len(chunk)
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away (early-closed size probe or dropped keep-alive)
+
+    def do_GET(self):
+        self._send(include_body=True)
+
+    def do_HEAD(self):
+        self._send(include_body=False)
+
+
+class FixtureServer:
+    """
+    Threaded HTTP fixture bound to localhost on a free port.
+
+    Use as a context manager; ``url(size)`` returns the URL of a synthetic
+    file of that many bytes.
+    """
+
+    def __init__(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _MediaHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.files = {}
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, size: int, ext: str = "bin") -> str:
+        """URL of a synthetic file of size bytes (with a query so pytube can append to it)."""
+        return f"{self.base_url}/media/{size}.{ext}?id={size}"
+
+    def add_file(self, name: str, data: bytes) -> str:
+        """Serve data under /files/<name> and return its URL."""
+        self.httpd.files[name] = data
+        return f"{self.base_url}/files/{name}?id={name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,309 @@
+import os
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Type
+
+from atomic_write import DEFAULT_BUFFER_SIZE, YTDLP_FILENAME, AtomicWriter, media_filename, sync_file
+from bandwidth import BandwidthJob, BandwidthManager, bandwidth_manager
+from http_pool import stream_media
+from tracing import tracer
+
+# Called with (bytes downloaded so far, total bytes or None if unknown)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class MediaInfo(NamedTuple):
+    """Basic metadata of a video."""
+    video_id: str
+    title: str
+    channel: Optional[str]
+    duration: Optional[float]
+
+
+class FormatInfo(NamedTuple):
+    """One downloadable format of a video."""
+    format_id: str
+    ext: str
+    vcodec: str
+    acodec: str
+    width: Optional[int]
+    height: Optional[int]
+    bitrate: Optional[float]
+    filesize: Optional[int]
+    url: Optional[str]
+
+
+class _Meter:
+    """
+    Progress callback that draws new bytes from a bandwidth job.
+
+    The job is registered when the first bytes arrive, so resolving
+    metadata before the transfer holds no share of the budget.
+    """
+
+    def __init__(self, bandwidth: BandwidthManager, label: str, progress: Optional[ProgressCallback]):
+        self.bandwidth = bandwidth
+        self.label = label
+        self.progress = progress
+        self.job: Optional[BandwidthJob] = None
+        self.bytes = 0
+        self._last = 0
+
+    def __call__(self, downloaded: int, total: Optional[int]):
+        if downloaded < self._last:
+            self._last = 0  # Next file of a multi-part download
+        new_bytes = downloaded - self._last
+        self._last = downloaded
+        self.bytes += new_bytes
+        if self.job is None:
+            self.job = self.bandwidth.register(self.label)
+        # Blocking here throttles the library's read loop
+        self.job.consume(new_bytes)
+        if self.progress:
+            self.progress(downloaded, total)
+
+
+class DownloadBackend(ABC):
+    """
+    Common interface of the download libraries used by the applications.
+
+    Backends resolve metadata, list formats and download a chosen format.
+    transfer() exposes each library's raw HTTP download path on its own,
+    so backends can be compared against any direct media URL. Every
+    transfer draws from the shared bandwidth budget and is traced.
+    The format id "best" is accepted by every backend.
+    """
+
+    name = ""
+
+    def __init__(self, bandwidth: Optional[BandwidthManager] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            bandwidth: Budget transfers draw from (defaults to the process-wide manager)
+        """
+        self.bandwidth = bandwidth or bandwidth_manager
+
+    @contextmanager
+    def _metered(self, label: str, progress: Optional[ProgressCallback]) -> Iterator[_Meter]:
+        """Meter one transfer against the bandwidth budget and trace it."""
+        meter = _Meter(self.bandwidth, label, progress)
+        try:
+            with tracer.span("transfer", backend=self.name, label=label) as span:
+                yield meter
+                span.set(bytes=meter.bytes)
+        finally:
+            if meter.job:
+                meter.job.close()
+
+    @abstractmethod
+    def resolve(self, url: str) -> MediaInfo:
+        """Fetch the metadata of the video at url."""
+
+    @abstractmethod
+    def list_formats(self, url: str) -> List[FormatInfo]:
+        """List the downloadable formats of the video at url."""
+
+    @abstractmethod
+    def download(
+        self,
+        url: str,
+        format_id: str,
+        dest_dir: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        """
+        Download one format of a video.
+
+        Args:
+            url: The video URL
+            format_id: The format to download (from list_formats)
+            dest_dir: Directory to save into
+            progress: Called as data arrives
+
+        Returns:
+            Path to the downloaded file
+        """
+
+    @abstractmethod
+    def transfer(
+        self,
+        media_url: str,
+        dest_path: str,
+        progress: Optional[ProgressCallback] = None,
+    ) -> str:
+        """
+        Download a direct media URL with this backend's HTTP machinery.
+
+        Args:
+            media_url: URL of the media file itself
+            dest_path: File to write
+            progress: Called as data arrives
+
+        Returns:
+            Path to the downloaded file
+        """
+
+
+class YtDlpBackend(DownloadBackend):
+    """Backend built on yt-dlp."""
+
+    name = "yt-dlp"
+
+    def __init__(self, ydl_opts: Optional[Dict] = None, bandwidth: Optional[BandwidthManager] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            ydl_opts: Extra yt-dlp options applied to every call
+            bandwidth: Budget transfers draw from (defaults to the process-wide manager)
+        """
+        super().__init__(bandwidth)
+        import yt_dlp
+
+        self._yt_dlp = yt_dlp
+        self.ydl_opts = {'quiet': True, 'no_warnings': True, 'noprogress': True}
+        self.ydl_opts.update(ydl_opts or {})
+
+    def _ydl(self, progress: Optional[ProgressCallback] = None, **options):
+        opts = dict(self.ydl_opts, **options)
+        if progress:
+            def hook(d):
+                if d['status'] in ('downloading', 'finished'):
+                    total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                    progress(d.get('downloaded_bytes', 0), total)
+            opts['progress_hooks'] = [hook]
+        return self._yt_dlp.YoutubeDL(opts)
+
+    def _info(self, url: str) -> Dict:
+        with self._ydl(skip_download=True) as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def resolve(self, url: str) -> MediaInfo:
+        info = self._info(url)
+        return MediaInfo(info['id'], info.get('title', ''), info.get('uploader'), info.get('duration'))
+
+    def list_formats(self, url: str) -> List[FormatInfo]:
+        return [
+            FormatInfo(
+                format_id=f['format_id'],
+                ext=f.get('ext', ''),
+                vcodec=f.get('vcodec') or 'none',
+                acodec=f.get('acodec') or 'none',
+                width=f.get('width'),
+                height=f.get('height'),
+                bitrate=f.get('tbr'),
+                filesize=f.get('filesize') or f.get('filesize_approx'),
+                url=f.get('url'),
+            )
+            for f in self._info(url).get('formats', [])
+        ]
+
+    def download(self, url, format_id, dest_dir, progress=None) -> str:
+        outtmpl = os.path.join(dest_dir, YTDLP_FILENAME)
+        with self._metered(url, progress) as meter, \
+                self._ydl(meter, format=format_id, outtmpl=outtmpl, buffersize=DEFAULT_BUFFER_SIZE) as ydl:
+            info = ydl.extract_info(url, download=True)
+            filename = ydl.prepare_filename(info)
+        sync_file(filename)
+        return filename
+
+    def transfer(self, media_url, dest_path, progress=None) -> str:
+        with self._metered(dest_path, progress) as meter, self._ydl(meter) as ydl:
+            ydl.dl(dest_path, {'url': media_url, 'ext': os.path.splitext(dest_path)[1][1:]})
+        return dest_path
+
+
+class PytubeBackend(DownloadBackend):
+    """
+    Backend built on pytube.
+
+    Requests go through pytube's request module, which is shared by the
+    whole process: after http_pool.install_pytube() every pytube
+    request, from this backend or elsewhere, uses the shared keep-alive
+    pool. Applications opt in once at startup.
+    """
+
+    name = "pytube"
+
+    def __init__(self, bandwidth: Optional[BandwidthManager] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            bandwidth: Budget transfers draw from (defaults to the process-wide manager)
+        """
+        super().__init__(bandwidth)
+        from pytube import YouTube, request
+
+        self._youtube = YouTube
+        self._request = request
+
+    def resolve(self, url: str) -> MediaInfo:
+        yt = self._youtube(url)
+        return MediaInfo(yt.video_id, yt.title, yt.author, yt.length)
+
+    def list_formats(self, url: str) -> List[FormatInfo]:
+        formats = []
+        for stream in self._youtube(url).streams:
+            height = int(stream.resolution[:-1]) if stream.resolution else None
+            formats.append(FormatInfo(
+                format_id=str(stream.itag),
+                ext=stream.subtype,
+                vcodec=stream.video_codec or 'none',
+                acodec=stream.audio_codec or 'none',
+                width=None,
+                height=height,
+                bitrate=stream.bitrate / 1000 if stream.bitrate else None,
+                filesize=stream.filesize,
+                url=stream.url,
+            ))
+        return formats
+
+    def download(self, url, format_id, dest_dir, progress=None) -> str:
+        yt = self._youtube(url)
+        if format_id == "best":
+            stream = yt.streams.get_highest_resolution()
+        else:
+            stream = yt.streams.get_by_itag(int(format_id))
+        if stream is None:
+            raise ValueError(f"Format {format_id} is not available")
+        filename = media_filename(stream.title, yt.video_id, stream.itag, stream.subtype)
+        return self._transfer(stream.url, os.path.join(dest_dir, filename), stream.filesize, progress)
+
+    def transfer(self, media_url, dest_path, progress=None) -> str:
+        return self._transfer(media_url, dest_path, None, progress)
+
+    def _transfer(self, media_url, dest_path, total, progress) -> str:
+        downloaded = 0
+        with self._metered(dest_path, progress) as meter, AtomicWriter(dest_path, total) as f:
+            for chunk in stream_media(media_url, execute=self._request._execute_request):
+                f.write(chunk)
+                downloaded += len(chunk)
+                meter(downloaded, total)
+        return dest_path
+
+
+BACKENDS: Dict[str, Type[DownloadBackend]] = {
+    YtDlpBackend.name: YtDlpBackend,
+    PytubeBackend.name: PytubeBackend,
+}
+
+
+def get_backend(name: str, **options) -> DownloadBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        name: One of BACKENDS
+        **options: Passed to the backend's constructor
+
+    Returns:
+        The backend instance
+    """
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown backend: {name}") from None
+    return backend_class(**options)
@@ -0,0 +1,307 @@
+import os
+import uuid
+import errno
+import shutil
+import sqlite3
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+# Default location of the completed-downloads index
+DEFAULT_DB_PATH = os.path.join(
+    os.path.expanduser("~"), ".youtube_downloader", "downloads.sqlite3"
+)
+
+# ioctl request number for FICLONE (copy-on-write clone on btrfs/xfs)
+_FICLONE = 0x40049409
+
+# os.link errors meaning "hardlinks not possible here", so clone or copy instead
+_NO_HARDLINK = (errno.EXDEV, errno.EPERM, errno.EMLINK)
+
+
+class DownloadRecord(NamedTuple):
+    """A completed download stored in the index."""
+    video_id: str
+    format_id: str
+    path: str
+    size: int
+    sha256: str
+    completed_at: float
+
+
+class _Flight:
+    """An in-progress download that other requests can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.record: Optional[DownloadRecord] = None
+        self.error: Optional[BaseException] = None
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Args:
+        path: The file to hash
+        chunk_size: Number of bytes read per iteration
+
+    Returns:
+        The hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Try to create dst as a copy-on-write clone of src.
+
+    dst must not exist; an existing file is never opened for writing.
+
+    Returns:
+        bool: True if the clone was created, False if unsupported
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    try:
+        with open(src, "rb") as s, open(dst, "xb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dst):
+            os.remove(dst)
+        return False
+
+
+class DownloadStore:
+    """
+    SQLite index of completed downloads keyed by video id and format id.
+
+    Requests for media that is already on disk are answered with a
+    hardlink, reflink or copy of the existing file (or a no-op when the
+    file is already in place). Concurrent requests for the same item
+    inside this process are collapsed into a single transfer.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Initialize the store, creating the index if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._inflight: Dict[Tuple[str, str], _Flight] = {}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS downloads ("
+                " video_id TEXT NOT NULL,"
+                " format_id TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " completed_at REAL NOT NULL,"
+                " PRIMARY KEY (video_id, format_id))"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run one transaction on a new connection, closing it afterwards.
+
+        A connection per call keeps the store thread-safe.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, video_id: str, format_id: str) -> Optional[DownloadRecord]:
+        """
+        Look up a completed download.
+
+        Records whose file has disappeared or changed size are dropped.
+
+        Args:
+            video_id: The YouTube video id
+            format_id: The yt-dlp format id or pytube itag
+
+        Returns:
+            The matching record, or None if the item is not on disk
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT video_id, format_id, path, size, sha256, completed_at "
+                "FROM downloads WHERE video_id = ? AND format_id = ?",
+                (video_id, str(format_id)),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        record = DownloadRecord(*row)
+        try:
+            if os.path.getsize(record.path) == record.size:
+                return record
+        except OSError:
+            pass
+
+        self.forget(video_id, format_id)
+        return None
+
+    def record(self, video_id: str, format_id: str, path: str) -> DownloadRecord:
+        """
+        Add a completed download to the index.
+
+        Args:
+            video_id: The YouTube video id
+            format_id: The yt-dlp format id or pytube itag
+            path: Path of the downloaded file
+
+        Returns:
+            The stored record
+        """
+        path = os.path.abspath(path)
+        record = DownloadRecord(
+            video_id=video_id,
+            format_id=str(format_id),
+            path=path,
+            size=os.path.getsize(path),
+            sha256=file_sha256(path),
+            completed_at=time.time(),
+        )
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO downloads VALUES (?, ?, ?, ?, ?, ?)",
+                record,
+            )
+        return record
+
+    def forget(self, video_id: str, format_id: str):
+        """Remove an item from the index (the file itself is left alone)."""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM downloads WHERE video_id = ? AND format_id = ?",
+                (video_id, str(format_id)),
+            )
+
+    def materialize(self, record: DownloadRecord, dest_dir: str) -> str:
+        """
+        Make a stored download available in dest_dir.
+
+        Args:
+            record: The stored download
+            dest_dir: Directory the caller wants the file in
+
+        Returns:
+            Path of the file inside dest_dir
+        """
+        target = os.path.join(dest_dir, os.path.basename(record.path))
+
+        if os.path.exists(target):
+            if os.path.samefile(target, record.path):
+                return target
+            if os.path.getsize(target) == record.size and file_sha256(target) == record.sha256:
+                return target
+
+        os.makedirs(dest_dir, exist_ok=True)
+        try:
+            os.link(record.path, target)
+            return target
+        except FileExistsError:
+            # Another materialization won the race, or a stale file is in the way
+            if os.path.samefile(target, record.path):
+                return target
+        except OSError as e:
+            if e.errno not in _NO_HARDLINK:
+                raise
+
+        # Build the file under a fresh name and swap it in, so neither the
+        # stored original nor a file another thread just linked is ever
+        # opened for writing
+        temp = os.path.join(dest_dir, f".{os.path.basename(target)}.{uuid.uuid4().hex}.tmp")
+        try:
+            try:
+                os.link(record.path, temp)
+            except OSError as e:
+                if e.errno not in _NO_HARDLINK:
+                    raise
+                if not _reflink(record.path, temp):
+                    shutil.copy2(record.path, temp)
+            os.replace(temp, target)
+        finally:
+            if os.path.exists(temp):
+                os.remove(temp)
+        return target
+
+    def fetch(
+        self,
+        video_id: str,
+        format_id: str,
+        dest_dir: str,
+        download: Callable[[], str],
+    ) -> Tuple[str, bool]:
+        """
+        Return a local copy of an item, downloading it only if needed.
+
+        Args:
+            video_id: The YouTube video id
+            format_id: The yt-dlp format id or pytube itag
+            dest_dir: Directory the file should end up in
+            download: Callable performing the transfer and returning the file path
+
+        Returns:
+            Tuple of (file path, True if this call performed the download)
+        """
+        key = (video_id, str(format_id))
+
+        record = self.get(*key)
+        if record is not None:
+            return self.materialize(record, dest_dir), False
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self.materialize(flight.record, dest_dir), False
+
+        try:
+            # Another process may have finished it while we were checking
+            flight.record = self.get(*key)
+            fetched = flight.record is None
+            if fetched:
+                flight.record = self.record(video_id, format_id, download())
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+        return self.materialize(flight.record, dest_dir), fetched
@@ -0,0 +1,157 @@
+"""
+Compact per-format records extracted from yt-dlp info dicts.
+
+A yt-dlp info dict carries every format's URL, HTTP headers, fragment
+lists and more, often hundreds of kilobytes per video. The applications
+only need a handful of fields per format, so formats_from_info() copies
+those into slotted records and the info dict can be dropped right away.
+Repeated strings (codecs, extensions, notes) are interned so thousands of
+queued videos share a single copy, and display text is only built when a
+format is shown.
+"""
+import sys
+import time
+from typing import Dict, List, Optional
+
+from manifest_cache import url_expiry
+
+# Quality given to the audio-only entry so it sorts after every video format
+AUDIO_ONLY_QUALITY = -1
+
+
+def format_human_size(size: float) -> str:
+    """
+    Format a byte count for display.
+
+    Args:
+        size: Size in bytes
+
+    Returns:
+        The size in B, KB, MB or GB with one decimal
+    """
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _intern(value) -> str:
+    return sys.intern(str(value)) if value is not None else ''
+
+
+class FormatRecord:
+    """The fields of one downloadable format that the UI and downloader use."""
+
+    __slots__ = (
+        "format_id", "ext", "vcodec", "acodec", "width", "height",
+        "bitrate", "filesize", "quality", "note", "expires_at",
+    )
+
+    def __init__(
+        self,
+        format_id: str,
+        ext: str,
+        vcodec: str,
+        acodec: str,
+        width: Optional[int],
+        height: Optional[int],
+        bitrate: Optional[float],
+        filesize: Optional[int],
+        quality: float,
+        note: str,
+        expires_at: float,
+    ):
+        self.format_id = format_id
+        self.ext = ext
+        self.vcodec = vcodec
+        self.acodec = acodec
+        self.width = width
+        self.height = height
+        self.bitrate = bitrate
+        self.filesize = filesize
+        self.quality = quality
+        self.note = note
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_ytdlp(cls, f: Dict, fetched_at: float, quality: Optional[float] = None) -> "FormatRecord":
+        """
+        Copy the needed fields out of one entry of a yt-dlp info dict's formats.
+
+        Args:
+            f: The format dict
+            fetched_at: When the info dict was extracted
+            quality: Override for the format's sort quality
+
+        Returns:
+            The compact record
+        """
+        url = f.get('url')
+        return cls(
+            format_id=_intern(f['format_id']),
+            ext=_intern(f.get('ext') or '?'),
+            vcodec=_intern(f.get('vcodec') or 'none'),
+            acodec=_intern(f.get('acodec') or 'none'),
+            width=f.get('width'),
+            height=f.get('height'),
+            bitrate=f.get('tbr'),
+            filesize=f.get('filesize') or f.get('filesize_approx'),
+            quality=(f.get('quality') or 0) if quality is None else quality,
+            note=_intern(f.get('format_note') or ''),
+            expires_at=url_expiry(url, fetched_at) if url else fetched_at,
+        )
+
+    @property
+    def audio_only(self) -> bool:
+        """Whether the format has no video track."""
+        return self.vcodec == 'none'
+
+    @property
+    def display_name(self) -> str:
+        """Text shown for the format in the format list, built on access."""
+        if self.audio_only:
+            return f"Audio only - {self.note} ({self.ext})"
+        resolution = f"{self.width or '?'}x{self.height or '?'}"
+        return f"{resolution} - {self.note} ({self.ext}, {format_human_size(self.filesize or 0)})"
+
+    def expired(self, margin: float = 0) -> bool:
+        """Whether the format's stream URL has expired (or will within margin seconds)."""
+        return time.time() + margin >= self.expires_at
+
+    def __repr__(self):
+        return f"FormatRecord({self.format_id!r}, {self.ext!r}, {self.vcodec!r}, {self.acodec!r})"
+
+
+def formats_from_info(info: Dict, fetched_at: Optional[float] = None) -> List[FormatRecord]:
+    """
+    Pick the offered formats out of a yt-dlp info dict.
+
+    Every format with both video and audio is offered, plus the best
+    audio-only format at the end. Nothing in the result references info.
+
+    Args:
+        info: The dict returned by YoutubeDL.extract_info()
+        fetched_at: When info was extracted (defaults to now)
+
+    Returns:
+        Records sorted by quality, highest first
+    """
+    if fetched_at is None:
+        fetched_at = time.time()
+
+    records = []
+    best_audio = None
+    for f in info.get('formats', []):
+        if f.get('acodec', 'none') == 'none':
+            continue
+        if f.get('vcodec', 'none') != 'none':
+            records.append(FormatRecord.from_ytdlp(f, fetched_at))
+        elif f.get('vcodec') == 'none':
+            if best_audio is None or (f.get('quality') or 0) > (best_audio.get('quality') or 0):
+                best_audio = f
+
+    if best_audio is not None:
+        records.append(FormatRecord.from_ytdlp(best_audio, fetched_at, AUDIO_ONLY_QUALITY))
+
+    records.sort(key=lambda r: r.quality, reverse=True)
+    return records
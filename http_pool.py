@@ -0,0 +1,356 @@
+import json
+import socket
+import threading
+import http.client
+from io import BytesIO
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import Request, getproxies, proxy_bypass, urlopen
+
+# Idle keep-alive connections kept per (scheme, host, port)
+MAX_IDLE_PER_HOST = 4
+
+# Redirects followed before giving up, like urllib's default handler
+MAX_REDIRECTS = 10
+
+# Bytes requested per range of a media stream, the same as pytube
+RANGE_SIZE = 9 * 1024 * 1024
+
+# Bytes read from a media response at a time, so throttled readers pace the socket
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Errors that mean a reused keep-alive connection was closed by the server
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+_HostKey = Tuple[str, str, int]
+
+
+class PooledResponse:
+    """
+    File-like HTTP response that returns its connection to the pool.
+
+    The connection goes back to the pool once the body has been read to the
+    end. Responses that are closed or dropped early take their connection
+    with them, so a half-read socket is never reused.
+    """
+
+    def __init__(self, pool: "ConnectionPool", key: _HostKey,
+                 conn: http.client.HTTPConnection, response: http.client.HTTPResponse, url: str):
+        self._pool = pool
+        self._key = key
+        self._conn: Optional[http.client.HTTPConnection] = conn
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def _maybe_release(self):
+        if self._conn is not None and self._response.isclosed():
+            conn, self._conn = self._conn, None
+            if self._response.will_close:
+                conn.close()
+            else:
+                self._pool._release(self._key, conn)
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        data = self._response.read(amt)
+        self._maybe_release()
+        return data
+
+    def info(self):
+        return self.headers
+
+    def getheader(self, name: str, default=None):
+        return self.headers.get(name, default)
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def close(self):
+        self._response.close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of keep-alive HTTP(S) connections.
+
+    Connections are reused per host, so repeated requests to the same
+    server skip the TCP and TLS handshakes. Requests go directly to the
+    server; pooled_execute_request sends proxied URLs through urllib instead.
+    """
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST):
+        """
+        Initialize an empty pool.
+
+        Args:
+            max_idle_per_host: Idle connections kept open per host
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self._lock = threading.Lock()
+        self._idle: Dict[_HostKey, List[http.client.HTTPConnection]] = {}
+        self.created = 0
+        self.reused = 0
+
+    def _acquire(self, key: _HostKey, timeout) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection for key, or a new one, and whether it was reused."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                conn = idle.pop()
+                reused = True
+            else:
+                self.created += 1
+                conn = None
+                reused = False
+
+        scheme, host, port = key
+        if conn is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(host, port, timeout=timeout)
+            else:
+                conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        else:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(
+                    socket.getdefaulttimeout() if timeout is socket._GLOBAL_DEFAULT_TIMEOUT else timeout
+                )
+        return conn, reused
+
+    def _release(self, key: _HostKey, conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, key: _HostKey, method: str, target: str,
+              headers: Dict[str, str], data: Optional[bytes], timeout):
+        """Send one request, retrying once on a fresh connection if a reused one went stale."""
+        while True:
+            conn, reused = self._acquire(key, timeout)
+            try:
+                conn.request(method, target, body=data, headers=headers)
+                return conn, conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except Exception:
+                conn.close()
+                raise
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        data: Optional[bytes] = None,
+        timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    ) -> PooledResponse:
+        """
+        Perform a request, following redirects like urllib.request.urlopen.
+
+        Args:
+            method: HTTP method
+            url: Absolute http(s) URL
+            headers: Request headers
+            data: Request body
+            timeout: Socket timeout in seconds
+
+        Returns:
+            The response; read it to the end to return the connection to the pool
+
+        Raises:
+            urllib.error.HTTPError: For 4xx/5xx responses
+            urllib.error.URLError: If the server cannot be reached
+        """
+        headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in ("http", "https"):
+                raise ValueError(f"Unsupported URL scheme: {url}")
+            key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+            target = parts.path or "/"
+            if parts.query:
+                target += "?" + parts.query
+
+            try:
+                conn, raw = self._send(key, method, target, headers, data, timeout)
+            except OSError as e:
+                raise URLError(e) from e
+
+            response = PooledResponse(self, key, conn, raw, url)
+            if method == "HEAD":
+                response.read()
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                response.read()
+                url = urljoin(url, response.getheader("Location"))
+                if response.status == 303 or (response.status in (301, 302) and method == "POST"):
+                    method, data = "GET", None
+                continue
+
+            if response.status >= 400:
+                body = response.read()
+                raise HTTPError(url, response.status, response.reason, response.headers, BytesIO(body))
+
+            return response
+
+        raise HTTPError(url, response.status, "Too many redirects", response.headers, None)
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+# Pool shared by all pytube traffic in this process
+shared_pool = ConnectionPool()
+
+
+def uses_proxy(url: str) -> bool:
+    """
+    Check whether the proxy settings (e.g. HTTPS_PROXY and NO_PROXY) apply to a URL.
+
+    Args:
+        url: Absolute http(s) URL
+
+    Returns:
+        True if urllib would send the request through a proxy
+    """
+    parts = urlsplit(url)
+    return parts.scheme.lower() in getproxies() and not proxy_bypass(parts.hostname or "")
+
+
+def pooled_execute_request(
+    url,
+    method=None,
+    headers=None,
+    data=None,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+):
+    """Drop-in replacement for pytube.request._execute_request using shared_pool."""
+    base_headers = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en"}
+    if headers:
+        base_headers.update(headers)
+    if data and not isinstance(data, bytes):
+        data = bytes(json.dumps(data), encoding="utf-8")
+    if not url.lower().startswith("http"):
+        raise ValueError("Invalid URL")
+    if method is None:
+        method = "POST" if data else "GET"
+    if uses_proxy(url):
+        # The pool only makes direct connections; let urllib go through the proxy
+        request = Request(url, headers=base_headers, method=method, data=data)
+        return urlopen(request, timeout=timeout)
+    return shared_pool.request(method, url, headers=base_headers, data=data, timeout=timeout)
+
+
+def _open_range(execute: Callable, url: str, timeout, max_retries: int):
+    """Request one range, retrying timeouts and truncated responses like pytube."""
+    for attempt in range(max_retries + 1):
+        try:
+            return execute(url, method="GET", timeout=timeout)
+        except URLError as e:
+            if not isinstance(e.reason, socket.timeout) or attempt == max_retries:
+                raise
+        except http.client.IncompleteRead:
+            if attempt == max_retries:
+                raise
+
+
+def _stream_size(execute: Callable, url: str, first_range, requested: int, timeout) -> int:
+    """Total size of a stream, probing for it only if the first range came back full."""
+    length = int(first_range.info().get("Content-Length") or 0)
+    if length < requested:
+        return length
+    probe = execute(f"{url}&range=0-99999999999", method="GET", timeout=timeout)
+    try:
+        return int(probe.info()["Content-Length"])
+    except (KeyError, TypeError, ValueError):
+        return requested
+    finally:
+        probe.close()
+
+
+def stream_media(
+    url: str,
+    timeout=socket._GLOBAL_DEFAULT_TIMEOUT,
+    max_retries: int = 0,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    execute: Optional[Callable] = None,
+) -> Iterator[bytes]:
+    """
+    Drop-in replacement for pytube.request.stream that reads in bounded slices.
+
+    pytube reads each range with a single read(), so a consumer that
+    throttles between chunks only gets control after a whole range has
+    arrived at line speed. Here each range is read chunk_size bytes at a
+    time, and the next read happens only when the consumer asks for more.
+
+    Args:
+        url: The media URL (a query string is expected, as with pytube)
+        timeout: Socket timeout in seconds
+        max_retries: Extra attempts per range after a timeout or truncated response
+        chunk_size: Largest chunk yielded
+        execute: Request function with pytube's _execute_request signature
+            (defaults to pooled_execute_request)
+
+    Yields:
+        The media, chunk_size bytes or less at a time
+    """
+    execute = execute or pooled_execute_request
+    file_size = None
+    downloaded = 0
+    while file_size is None or downloaded < file_size:
+        stop = downloaded + RANGE_SIZE - 1
+        if file_size is not None:
+            stop = min(stop, file_size - 1)
+        response = _open_range(execute, f"{url}&range={downloaded}-{stop}", timeout, max_retries)
+        with response:
+            if file_size is None:
+                file_size = _stream_size(execute, url, response, stop + 1, timeout)
+            start = downloaded
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                downloaded += len(chunk)
+                yield chunk
+        if downloaded == start:
+            return  # The server has nothing more to send
+
+
+def install_pytube():
+    """Route all pytube HTTP requests through the shared connection pool."""
+    from pytube import request
+
+    request._execute_request = pooled_execute_request
+    request.stream = stream_media
@@ -1,9 +1,16 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from typing import List
 
+from admission import AdmissionController, AdmissionMiddleware
+
 app = FastAPI()
 
+# Limits come from LAYOUT_MAX_CONCURRENCY, LAYOUT_MAX_QUEUE and LAYOUT_QUEUE_TIMEOUT
+admission = AdmissionController()
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 class LayoutRequest(BaseModel):
     app_purpose: str
     features: List[str]
@@ -13,22 +20,24 @@ class ScreenComponent(BaseModel):
     components: List[str]
 
 @app.post("/generate-layout")
-def generate_layout(data: LayoutRequest):
+async def generate_layout(data: LayoutRequest):
+    # Pure rule evaluation: runs on the event loop instead of the threadpool
+    features = {f.lower() for f in data.features}
     screens = []
 
-    if "home" in [f.lower() for f in data.features] or "navigation" in data.app_purpose.lower():
+    if "home" in features or "navigation" in data.app_purpose.lower():
         screens.append({"screen": "Home", "components": ["Welcome message", "Navigation menu"]})
 
-    if "gallery" in [f.lower() for f in data.features]:
+    if "gallery" in features:
         screens.append({"screen": "Browse", "components": ["Gallery control", "Search box", "Sort dropdown"]})
 
-    if "details" in [f.lower() for f in data.features]:
+    if "details" in features:
         screens.append({"screen": "Details", "components": ["Display form", "Back button", "Edit button"]})
 
-    if "form" in [f.lower() for f in data.features] or "edit" in [f.lower() for f in data.features]:
+    if "form" in features or "edit" in features:
         screens.append({"screen": "Edit", "components": ["Edit form", "Submit button", "Cancel button"]})
 
-    if "approval" in [f.lower() for f in data.features]:
+    if "approval" in features:
         screens.append({"screen": "Admin", "components": ["Approval button", "Comment box", "Status indicator"]})
 
     if not screens:
@@ -38,3 +47,7 @@ def generate_layout(data: LayoutRequest):
         })
 
     return {"layout": screens}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return admission.render_metrics()
@@ -0,0 +1,275 @@
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Default location of the on-disk manifest tier
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".youtube_downloader", "manifests"
+)
+
+# Lifetime assumed for stream URLs without an expire= parameter
+DEFAULT_URL_LIFETIME = 6 * 60 * 60
+
+# Treat URLs as expired this many seconds early, so a download has time to finish
+EXPIRY_MARGIN = 5 * 60
+
+# Parsed player ciphers kept in memory, one per player version
+MAX_PLAYER_VERSIONS = 4
+
+
+class StreamEntry(NamedTuple):
+    """One stream of a video with its deciphered URL."""
+    itag: int
+    abr: Optional[str]
+    mime_type: str
+    filesize: int
+    url: str
+    expires_at: float
+
+
+class VideoManifest(NamedTuple):
+    """The streams of one video, as needed to download without pytube."""
+    video_id: str
+    title: str
+    streams: List[StreamEntry]
+    fetched_at: float
+
+    @property
+    def expires_at(self) -> float:
+        """Time at which the first stream URL expires."""
+        return min((s.expires_at for s in self.streams), default=self.fetched_at)
+
+    def get(self, itag: int) -> Optional[StreamEntry]:
+        """Return the stream with the given itag, if any."""
+        for stream in self.streams:
+            if stream.itag == itag:
+                return stream
+        return None
+
+
+def url_expiry(url: str, fetched_at: float) -> float:
+    """
+    Read the expiry time of a signed googlevideo URL.
+
+    Args:
+        url: The deciphered stream URL
+        fetched_at: When the URL was obtained
+
+    Returns:
+        Unix time after which the URL stops working
+    """
+    expire = parse_qs(urlparse(url).query).get("expire")
+    if expire:
+        try:
+            return float(expire[0])
+        except ValueError:
+            pass
+    return fetched_at + DEFAULT_URL_LIFETIME
+
+
+def manifest_from_youtube(yt, only_audio: bool = True) -> VideoManifest:
+    """
+    Build a manifest from a loaded pytube YouTube object.
+
+    Args:
+        yt: The pytube YouTube object (its streams are fetched if needed)
+        only_audio: Keep only audio-only streams, ordered by bitrate
+
+    Returns:
+        The video's manifest
+    """
+    fetched_at = time.time()
+    streams = yt.streams.filter(only_audio=True).order_by('abr').desc() if only_audio else yt.streams
+    return VideoManifest(
+        video_id=yt.video_id,
+        title=yt.title,
+        streams=[
+            StreamEntry(
+                itag=int(stream.itag),
+                abr=stream.abr,
+                mime_type=stream.mime_type,
+                filesize=stream.filesize,
+                url=stream.url,
+                expires_at=url_expiry(stream.url, fetched_at),
+            )
+            for stream in streams
+        ],
+        fetched_at=fetched_at,
+    )
+
+
+class ManifestCache:
+    """
+    Cache of video manifests keyed by video id.
+
+    Entries live in a bounded in-memory LRU, with an optional JSON file per
+    video on disk so they survive restarts. Entries whose stream URLs are
+    about to expire are treated as missing.
+    """
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Manifests kept in memory
+            cache_dir: Directory of the on-disk tier (None for memory only)
+        """
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, VideoManifest]" = OrderedDict()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{video_id}.json")
+
+    @staticmethod
+    def _fresh(manifest: VideoManifest) -> bool:
+        return manifest.expires_at - EXPIRY_MARGIN > time.time()
+
+    def _remember(self, manifest: VideoManifest):
+        """Insert into the memory tier; caller must hold the lock."""
+        self._entries[manifest.video_id] = manifest
+        self._entries.move_to_end(manifest.video_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, video_id: str) -> Optional[VideoManifest]:
+        try:
+            with open(self._path(video_id), "r") as f:
+                data = json.load(f)
+            data["streams"] = [StreamEntry(*s) for s in data["streams"]]
+            return VideoManifest(**data)
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def get(self, video_id: str) -> Optional[VideoManifest]:
+        """
+        Look up a manifest whose URLs are still valid.
+
+        Args:
+            video_id: The YouTube video id
+
+        Returns:
+            The cached manifest, or None on a miss
+        """
+        with self._lock:
+            manifest = self._entries.get(video_id)
+            if manifest is not None:
+                if self._fresh(manifest):
+                    self._entries.move_to_end(video_id)
+                    return manifest
+                del self._entries[video_id]
+
+        if not self.cache_dir:
+            return None
+
+        manifest = self._load(video_id)
+        if manifest is None or not self._fresh(manifest):
+            self.invalidate(video_id)
+            return None
+
+        with self._lock:
+            self._remember(manifest)
+        return manifest
+
+    def put(self, manifest: VideoManifest):
+        """Store a manifest in memory and, if enabled, on disk."""
+        with self._lock:
+            self._remember(manifest)
+
+        if self.cache_dir:
+            data = manifest._asdict()
+            data["streams"] = [list(s) for s in manifest.streams]
+            # A private temporary name, as several threads may store the same video
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f".{manifest.video_id}.", suffix=".tmp", dir=self.cache_dir
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f)
+                os.replace(temp_path, self._path(manifest.video_id))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def invalidate(self, video_id: str):
+        """Drop a manifest, e.g. after its URLs were rejected."""
+        with self._lock:
+            self._entries.pop(video_id, None)
+        if self.cache_dir:
+            try:
+                os.remove(self._path(video_id))
+            except OSError:
+                pass
+
+
+_cipher_lock = threading.Lock()
+_ciphers: "OrderedDict[str, object]" = OrderedDict()
+
+
+def _player_key(js: str) -> str:
+    """Identify the player version a base.js belongs to."""
+    import pytube
+
+    js_url = getattr(pytube, "__js_url__", None)
+    if js_url and getattr(pytube, "__js__", None) is js:
+        match = re.search(r'/s/player/([\w-]+)/', js_url)
+        if match:
+            return match.group(1)
+    return hashlib.sha1(js.encode("utf-8")).hexdigest()
+
+
+def cached_cipher(js: str):
+    """
+    Return a pytube Cipher for js, parsing each player version only once.
+
+    Parsing the transform and throttling functions out of base.js is the
+    expensive part of deciphering. The parsed cipher is kept per player
+    version and a copy with fresh throttling state is handed out per call.
+
+    Args:
+        js: Contents of the player's base.js
+
+    Returns:
+        A Cipher ready for one video
+    """
+    from pytube.cipher import Cipher
+
+    key = _player_key(js)
+    with _cipher_lock:
+        template = _ciphers.get(key)
+        if template is not None:
+            _ciphers.move_to_end(key)
+
+    if template is None:
+        template = Cipher(js=js)
+        with _cipher_lock:
+            _ciphers[key] = template
+            while len(_ciphers) > MAX_PLAYER_VERSIONS:
+                _ciphers.popitem(last=False)
+
+    # calculate_n mutates the throttling array and memoizes its result
+    cipher = copy.copy(template)
+    cipher.throttling_array = copy.deepcopy(template.throttling_array)
+    cipher.calculated_n = None
+    return cipher
+
+
+def install_cipher_cache():
+    """Make pytube build its ciphers through cached_cipher."""
+    from pytube import extract
+
+    extract.Cipher = cached_cipher
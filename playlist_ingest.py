@@ -0,0 +1,341 @@
+import os
+import json
+import queue
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from tracing import tracer
+
+# Maximum page size allowed by the YouTube Data API
+PAGE_SIZE = 50
+
+# Default location of the listing checkpoints
+DEFAULT_CHECKPOINT_PATH = os.path.join(
+    os.path.expanduser("~"), ".youtube_downloader", "ingest_checkpoints.json"
+)
+
+
+class PlaylistPage(NamedTuple):
+    """One page of playlist items as returned by the Data API."""
+    page_token: Optional[str]
+    next_page_token: Optional[str]
+    video_ids: List[str]
+    total_results: int
+
+
+def uploads_playlist_id(youtube, channel_id: str) -> Optional[str]:
+    """
+    Look up the playlist holding all uploads of a channel.
+
+    Args:
+        youtube: Authenticated YouTube Data API service
+        channel_id: The channel id
+
+    Returns:
+        The uploads playlist id, or None if the channel does not exist
+    """
+    with tracer.span("data_api", call="channels.list"):
+        response = youtube.channels().list(part="contentDetails", id=channel_id).execute()
+    if not response.get('items'):
+        return None
+    return response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+
+def iter_playlist_pages(
+    youtube, playlist_id: str, page_token: Optional[str] = None
+) -> Iterator[PlaylistPage]:
+    """
+    Page through a playlist, yielding each page as soon as it arrives.
+
+    Args:
+        youtube: Authenticated YouTube Data API service
+        playlist_id: The playlist to list
+        page_token: Cursor to resume from (None to start at the beginning)
+
+    Yields:
+        PlaylistPage for every page of the playlist
+    """
+    while True:
+        with tracer.span("data_api", call="playlistItems.list", page_token=page_token):
+            response = youtube.playlistItems().list(
+                part="contentDetails",
+                playlistId=playlist_id,
+                maxResults=PAGE_SIZE,
+                pageToken=page_token,
+            ).execute()
+
+        next_page_token = response.get('nextPageToken')
+        yield PlaylistPage(
+            page_token=page_token,
+            next_page_token=next_page_token,
+            video_ids=[item['contentDetails']['videoId'] for item in response.get('items', [])],
+            total_results=response.get('pageInfo', {}).get('totalResults', 0),
+        )
+
+        if not next_page_token:
+            return
+        page_token = next_page_token
+
+
+def fetch_video_metadata(youtube, video_ids: List[str]) -> List[Dict[str, str]]:
+    """
+    Fetch compact metadata for up to PAGE_SIZE videos in one API call.
+
+    Private or deleted videos are left out of the result.
+
+    Args:
+        youtube: Authenticated YouTube Data API service
+        video_ids: Ids of the videos to fetch
+
+    Returns:
+        List of dicts with id, title, channel, duration and url
+    """
+    if not video_ids:
+        return []
+
+    with tracer.span("data_api", call="videos.list", videos=len(video_ids)):
+        response = youtube.videos().list(
+            part="snippet,contentDetails",
+            id=",".join(video_ids),
+            maxResults=PAGE_SIZE,
+        ).execute()
+
+    return [
+        {
+            'id': item['id'],
+            'title': item['snippet']['title'],
+            'channel': item['snippet']['channelTitle'],
+            'duration': item['contentDetails']['duration'],
+            'url': f"https://www.youtube.com/watch?v={item['id']}",
+        }
+        for item in response.get('items', [])
+    ]
+
+
+class IngestCursor(NamedTuple):
+    """Where an interrupted ingestion resumes."""
+    page_token: Optional[str]
+    handled: int
+
+
+class IngestCheckpoint:
+    """
+    Persists the listing cursor of each playlist so ingestion can resume.
+
+    Cursors are kept per (playlist, destination), so ingesting the same
+    playlist into another folder starts from the beginning.
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _destination_key(destination: str) -> str:
+        return os.path.normcase(os.path.abspath(destination)) if destination else ""
+
+    def _read(self) -> Dict[str, Dict[str, Dict]]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Anything else is a checkpoint file from an older version
+        return {
+            playlist_id: destinations
+            for playlist_id, destinations in data.items()
+            if isinstance(destinations, dict)
+        }
+
+    def _write(self, data: Dict[str, Dict[str, Dict]]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def load(self, playlist_id: str, destination: str = "") -> IngestCursor:
+        """Return where to resume (a None page token starts from scratch)."""
+        with self._lock:
+            entry = self._read().get(playlist_id, {}).get(self._destination_key(destination))
+        if not entry:
+            return IngestCursor(None, 0)
+        return IngestCursor(entry.get("page_token"), entry.get("handled", 0))
+
+    def save(self, playlist_id: str, destination: str, cursor: IngestCursor):
+        """Record that the first cursor.handled items, up to cursor.page_token, are done."""
+        with self._lock:
+            data = self._read()
+            data.setdefault(playlist_id, {})[self._destination_key(destination)] = cursor._asdict()
+            self._write(data)
+
+    def clear(self, playlist_id: str, destination: str = ""):
+        """Forget a playlist once it has been ingested completely."""
+        with self._lock:
+            data = self._read()
+            destinations = data.get(playlist_id, {})
+            if destinations.pop(self._destination_key(destination), None) is None:
+                return
+            if not destinations:
+                del data[playlist_id]
+            self._write(data)
+
+
+class _PageProgress:
+    """Outstanding items of one listed page."""
+
+    def __init__(self, page: PlaylistPage, remaining: int):
+        self.page = page
+        self.remaining = remaining
+
+
+class PlaylistIngestor:
+    """
+    Streams a playlist into a pool of download workers.
+
+    Pages are listed lazily and each page's videos are queued for download
+    as soon as their metadata arrives, so downloads start while later pages
+    are still being listed. The queue is bounded, which keeps memory
+    constant regardless of playlist length. The listing cursor is
+    checkpointed once every video of a page has been handled, so a crashed
+    ingestion resumes at the first unfinished page, with progress counting
+    the pages finished before the crash.
+    """
+
+    def __init__(
+        self,
+        youtube,
+        download: Callable[[Dict[str, str]], None],
+        workers: int = 2,
+        max_pending: int = PAGE_SIZE * 2,
+        checkpoint: Optional[IngestCheckpoint] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        on_error: Optional[Callable[[Dict[str, str], Exception], None]] = None,
+    ):
+        """
+        Initialize the ingestor.
+
+        Args:
+            youtube: Authenticated YouTube Data API service
+            download: Called with each video's metadata on a worker thread
+            workers: Number of concurrent download workers
+            max_pending: Videos that may wait in the download queue
+            checkpoint: Where to persist the listing cursor (None to disable)
+            on_progress: Called with (handled playlist items, total items in playlist);
+                unavailable videos count as handled
+            on_error: Called with (video, exception) when a download fails
+        """
+        self.youtube = youtube
+        self.download = download
+        self.workers = workers
+        self.max_pending = max_pending
+        self.checkpoint = checkpoint
+        self.on_progress = on_progress
+        self.on_error = on_error
+
+        self._lock = threading.Lock()
+        self._pages: "deque[_PageProgress]" = deque()
+        self._destination = ""
+        self._handled = 0
+        self._position = 0
+        self._checkpointed = 0
+        self._total = 0
+
+    def _worker(self, work: "queue.Queue"):
+        while True:
+            item = work.get()
+            if item is None:
+                return
+
+            video, progress, playlist_id = item
+            try:
+                self.download(video)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(video, e)
+            self._item_done(progress, playlist_id)
+
+    def _item_done(self, progress: _PageProgress, playlist_id: str):
+        with self._lock:
+            progress.remaining -= 1
+            self._handled += 1
+            self._position += 1
+            self._advance_checkpoint(playlist_id)
+            position, total = self._position, self._total
+
+        if self.on_progress:
+            self.on_progress(position, total)
+
+    def _advance_checkpoint(self, playlist_id: str):
+        """Move the cursor past leading pages that are complete; caller holds the lock."""
+        cursor = None
+        advanced = False
+        while self._pages and self._pages[0].remaining == 0:
+            page = self._pages.popleft().page
+            cursor = page.next_page_token
+            self._checkpointed += len(page.video_ids)
+            advanced = True
+
+        if advanced and cursor and self.checkpoint:
+            self.checkpoint.save(playlist_id, self._destination, IngestCursor(cursor, self._checkpointed))
+
+    def run(self, playlist_id: str, destination: str = "") -> int:
+        """
+        Ingest a playlist, blocking until every video has been handled.
+
+        Args:
+            playlist_id: The playlist to ingest
+            destination: Where the videos are saved; checkpoints are kept per destination
+
+        Returns:
+            Number of videos handled in this run
+        """
+        work: "queue.Queue" = queue.Queue(maxsize=self.max_pending)
+        threads = [
+            threading.Thread(target=self._worker, args=(work,), daemon=True)
+            for _ in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        start = self.checkpoint.load(playlist_id, destination) if self.checkpoint else IngestCursor(None, 0)
+        with self._lock:
+            self._pages.clear()
+            self._destination = destination
+            self._handled = 0
+            # Items on pages finished by an earlier, interrupted run
+            self._position = self._checkpointed = start.handled
+
+        try:
+            for page in iter_playlist_pages(self.youtube, playlist_id, start.page_token):
+                videos = fetch_video_metadata(self.youtube, page.video_ids)
+
+                with self._lock:
+                    self._total = page.total_results
+                    # Unavailable videos are dropped from the page up front
+                    progress = _PageProgress(page, len(videos))
+                    self._pages.append(progress)
+                    skipped = len(page.video_ids) - len(videos)
+                    self._position += skipped
+                    self._advance_checkpoint(playlist_id)
+                    position, total = self._position, self._total
+
+                if skipped and self.on_progress:
+                    self.on_progress(position, total)
+
+                for video in videos:
+                    work.put((video, progress, playlist_id))
+        finally:
+            for _ in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        with self._lock:
+            finished = not self._pages
+        if finished and self.checkpoint:
+            self.checkpoint.clear(playlist_id, destination)
+        return self._handled
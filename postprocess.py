@@ -0,0 +1,301 @@
+import os
+import queue
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from tracing import tracer
+
+# ffmpeg binary used by every stage
+FFMPEG = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+
+# Audio codec name -> (ffmpeg encoder, file extension)
+AUDIO_CODECS = {
+    "mp3": ("libmp3lame", "mp3"),
+    "opus": ("libopus", "opus"),
+    "aac": ("aac", "m4a"),
+    "flac": ("flac", "flac"),
+}
+
+# A stage is (stage name, keyword arguments)
+Stage = Tuple[str, Dict]
+
+
+class PostProcessResult(NamedTuple):
+    """Outcome of a post-processing job."""
+    source: str
+    output: str
+    timings: List[Tuple[str, float]]
+
+
+def _run_ffmpeg(args: List[str]):
+    """Run ffmpeg, raising RuntimeError with its output on failure."""
+    completed = subprocess.run(
+        [FFMPEG, "-hide_banner", "-loglevel", "error", "-y"] + args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if completed.returncode != 0:
+        message = completed.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(f"ffmpeg failed: {message[-500:]}")
+
+
+def extract_audio(path: str, codec: str = "mp3", bitrate: str = "192k") -> str:
+    """
+    Extract the audio track of a media file.
+
+    Args:
+        path: The input media file
+        codec: One of AUDIO_CODECS
+        bitrate: Target audio bitrate
+
+    Returns:
+        Path to the extracted audio file
+    """
+    encoder, ext = AUDIO_CODECS[codec]
+    output = f"{os.path.splitext(path)[0]}.{ext}"
+    if output == path:
+        output = f"{os.path.splitext(path)[0]}.audio.{ext}"
+    args = ["-i", path, "-vn", "-c:a", encoder]
+    if codec != "flac":
+        args += ["-b:a", bitrate]
+    _run_ffmpeg(args + [output])
+    return output
+
+
+def transcode(
+    path: str,
+    container: str = "mp4",
+    video_codec: str = "libx264",
+    audio_codec: str = "aac",
+    preset: str = "veryfast",
+) -> str:
+    """
+    Transcode a media file into another container and codecs.
+
+    Args:
+        path: The input media file
+        container: Extension of the output container
+        video_codec: ffmpeg video encoder
+        audio_codec: ffmpeg audio encoder
+        preset: Encoder speed preset
+
+    Returns:
+        Path to the transcoded file
+    """
+    output = f"{os.path.splitext(path)[0]}.{container}"
+    if output == path:
+        output = f"{os.path.splitext(path)[0]}.transcoded.{container}"
+    _run_ffmpeg([
+        "-i", path,
+        "-c:v", video_codec, "-preset", preset,
+        "-c:a", audio_codec,
+        output,
+    ])
+    return output
+
+
+def tag(path: str, metadata: Optional[Dict[str, str]] = None) -> str:
+    """
+    Write metadata tags into a media file in place (streams are copied).
+
+    Args:
+        path: The media file to tag
+        metadata: Tag name -> value, e.g. {"title": ..., "artist": ...}
+
+    Returns:
+        Path to the tagged file (same as path)
+    """
+    base, ext = os.path.splitext(path)
+    temp_path = f"{base}.tagging{ext}"
+    args = ["-i", path, "-map", "0", "-c", "copy"]
+    for key, value in (metadata or {}).items():
+        args += ["-metadata", f"{key}={value}"]
+    try:
+        _run_ffmpeg(args + [temp_path])
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+STAGES: Dict[str, Callable[..., str]] = {
+    "extract_audio": extract_audio,
+    "transcode": transcode,
+    "tag": tag,
+}
+
+
+def _run_stages(path: str, stages: Sequence[Stage]) -> Tuple[str, List[Tuple[str, float]], List[int], int]:
+    """
+    Run stages one after another in a worker process, timing each.
+
+    Returns:
+        Tuple of (output path, (stage, seconds) timings, stage start times
+        from perf_counter_ns for tracing, worker pid)
+    """
+    timings = []
+    starts = []
+    for name, options in stages:
+        start = time.perf_counter_ns()
+        path = STAGES[name](path, **options)
+        starts.append(start)
+        timings.append((name, (time.perf_counter_ns() - start) / 1e9))
+    return path, timings, starts, os.getpid()
+
+
+class PostProcessor:
+    """
+    Runs post-processing stages in a bounded process pool.
+
+    Completed downloads are handed over through a bounded queue, so the
+    download thread can move on to the next item while CPU-heavy work for
+    the previous one runs in another process. When the queue is full,
+    submit() blocks (or raises queue.Full), which pushes back on producers.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queued: int = 8):
+        """
+        Initialize the pool and its dispatcher.
+
+        Args:
+            max_workers: Number of worker processes (defaults to CPU count)
+            max_queued: Jobs that may wait for a free worker before submit() blocks
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queued)
+        self._slots = threading.Semaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._running = 0
+        self._timings: Dict[str, List[float]] = {}
+
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    @property
+    def queued(self) -> int:
+        """Jobs waiting for a free worker."""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> int:
+        """Jobs currently executing in the pool."""
+        return self._running
+
+    def submit(
+        self,
+        path: str,
+        stages: Sequence[Stage],
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> Future:
+        """
+        Queue a completed download for post-processing.
+
+        Args:
+            path: The downloaded file
+            stages: Stages to run in order, e.g. [("extract_audio", {"codec": "mp3"})]
+            block: Wait for room in the queue instead of raising queue.Full
+            timeout: Maximum seconds to wait for room when blocking
+
+        Returns:
+            Future resolving to a PostProcessResult
+        """
+        for name, _ in stages:
+            if name not in STAGES:
+                raise ValueError(f"Unknown post-processing stage: {name}")
+
+        future: Future = Future()
+        self._queue.put((path, list(stages), future, time.perf_counter()), block, timeout)
+        return future
+
+    def _dispatch(self):
+        """Move queued jobs into the pool as workers become free."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            path, stages, future, queued_at = item
+            self._slots.acquire()
+            waited = time.perf_counter() - queued_at
+            self._record("queue", waited)
+            tracer.record("postprocess.queue", time.perf_counter_ns() - int(waited * 1e9),
+                          int(waited * 1e9), path=path)
+            if not future.set_running_or_notify_cancel():
+                self._slots.release()
+                continue
+
+            with self._lock:
+                self._running += 1
+            try:
+                work = self._submit(path, stages)
+            except Exception as e:
+                # Never leave the slot or the caller's future hanging
+                with self._lock:
+                    self._running -= 1
+                self._slots.release()
+                future.set_exception(e)
+                continue
+            work.add_done_callback(
+                lambda work, path=path, future=future: self._finish(path, work, future)
+            )
+
+    def _submit(self, path: str, stages: Sequence[Stage]) -> Future:
+        """Submit to the pool, replacing it once if a worker died and broke it."""
+        try:
+            return self._pool.submit(_run_stages, path, stages)
+        except BrokenProcessPool:
+            self._pool.shutdown(wait=False)
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool.submit(_run_stages, path, stages)
+
+    def _finish(self, path: str, work: Future, future: Future):
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+        error = work.exception()
+        if error is not None:
+            future.set_exception(error)
+            return
+
+        output, timings, starts, pid = work.result()
+        for (name, seconds), start in zip(timings, starts):
+            self._record(name, seconds)
+            tracer.record(f"postprocess.{name}", start, int(seconds * 1e9), pid=pid, path=path)
+        future.set_result(PostProcessResult(path, output, timings))
+
+    def _record(self, stage: str, seconds: float):
+        with self._lock:
+            self._timings.setdefault(stage, []).append(seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage timings, including time spent waiting in the queue.
+
+        Returns:
+            Mapping of stage name to count, total, mean and max seconds
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "count": len(values),
+                    "total": sum(values),
+                    "mean": sum(values) / len(values),
+                    "max": max(values),
+                }
+                for stage, values in self._timings.items()
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and shut the pool down after queued jobs finish."""
+        self._queue.put(None)
+        if wait:
+            self._dispatcher.join()
+        self._pool.shutdown(wait=wait)
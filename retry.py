@@ -0,0 +1,101 @@
+import random
+import socket
+import time
+import http.client
+from typing import Callable, Iterator, Optional
+from urllib.error import HTTPError, URLError
+
+# HTTP status codes worth retrying besides 5xx
+RETRYABLE_STATUS = {408, 425, 429}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether an error is transient and the request may succeed later.
+
+    Network failures, timeouts, truncated responses, rate limiting and
+    server errors are retryable; everything else (4xx responses, parse
+    errors, unavailable videos) is treated as fatal.
+
+    Args:
+        error: The exception raised by the failed attempt
+
+    Returns:
+        bool: True if the call should be retried
+    """
+    if isinstance(error, HTTPError):
+        return error.code in RETRYABLE_STATUS or error.code >= 500
+    if isinstance(error, URLError):
+        return True
+    return isinstance(error, (socket.timeout, ConnectionError, http.client.HTTPException))
+
+
+class RetryPolicy:
+    """Retries a call with jittered exponential backoff on transient errors."""
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts: Total attempts including the first one
+            base_delay: Upper bound of the first backoff in seconds
+            max_delay: Cap on any single backoff in seconds
+            retryable: Predicate deciding which errors are worth retrying
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable
+
+    def delays(self) -> Iterator[float]:
+        """
+        Backoff before each retry ("full jitter": uniform in [0, base * 2^n]).
+
+        Yields:
+            Seconds to wait before retry n
+        """
+        for attempt in range(self.max_attempts - 1):
+            yield random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(
+        self,
+        func: Callable,
+        *args,
+        on_retry: Optional[Callable[[int, BaseException, float], None]] = None,
+        **kwargs,
+    ):
+        """
+        Call func, retrying transient failures.
+
+        Args:
+            func: The function to call
+            *args: Positional arguments for func
+            on_retry: Called with (attempt number, error, delay) before each retry
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            The last error if it is fatal or the attempts are exhausted
+        """
+        delays = self.delays()
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                delay = next(delays, None)
+                if delay is None or not self.retryable(e):
+                    raise
+                if on_retry:
+                    on_retry(attempt, e, delay)
+                time.sleep(delay)
+                attempt += 1
@@ -1,16 +1,47 @@
 import os
-import re
 import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, messagebox
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.error import HTTPError
 import customtkinter as ctk
 from pytube import YouTube
+from pytube.exceptions import MaxRetriesExceeded
+
+from atomic_write import AtomicWriter, media_filename
+from bandwidth import bandwidth_manager
+from download_store import DownloadStore
+from http_pool import install_pytube, stream_media
+from manifest_cache import (
+    DEFAULT_CACHE_DIR, ManifestCache, StreamEntry, VideoManifest, install_cipher_cache,
+    manifest_from_youtube
+)
+from postprocess import AUDIO_CODECS
+from retry import RetryPolicy, is_retryable
+from stream_encode import StreamingEncoder
+from tracing import tracer
+from youtube_urls import canonical_video_id
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Themes: "blue", "green", "dark-blue"
 
+# Send all pytube traffic through the shared keep-alive connection pool
+install_pytube()
+
+# Parse each YouTube player version's signature cipher only once
+install_cipher_cache()
+
+# Conversion choice meaning "save the stream as downloaded"
+ORIGINAL_FORMAT = "Original"
+
+# Retry transient network failures; unavailable videos and parse errors are fatal
+FETCH_RETRY_POLICY = RetryPolicy(
+    max_attempts=4,
+    retryable=lambda e: isinstance(e, MaxRetriesExceeded) or is_retryable(e)
+)
+
 class YouTubeAudioDownloader:
     """Main application class for YouTube Audio Downloader."""
     
@@ -29,12 +60,21 @@ class YouTubeAudioDownloader:
         # Default download directory (user's Downloads folder)
         self.download_dir = os.path.join(os.path.expanduser("~"), "Downloads")
         
-        # YouTube object placeholder
-        self.yt = None
+        # Parsed stream manifest of the current video
+        self.manifest: Optional[VideoManifest] = None
+        
+        # Recently fetched manifests, so re-checking a video skips the network
+        self.manifest_cache = ManifestCache(cache_dir=DEFAULT_CACHE_DIR)
         
         # Audio streams from YouTube
         self.audio_streams = []
         
+        # Index of completed downloads, shared by all download threads
+        self.download_store = DownloadStore()
+        
+        # Share of the process-wide bandwidth budget for the current download
+        self.bandwidth_job = None
+        
         # Create the UI elements
         self._create_ui()
     
@@ -99,6 +139,29 @@ class YouTubeAudioDownloader:
         )
         self.quality_dropdown.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
         
+        # Conversion Frame (encoding runs while the audio downloads)
+        convert_frame = ctk.CTkFrame(self.main_frame)
+        convert_frame.pack(fill=tk.X, pady=10)
+        
+        convert_label = ctk.CTkLabel(convert_frame, text="Convert to:")
+        convert_label.pack(side=tk.LEFT, padx=10)
+        
+        self.convert_var = tk.StringVar(value=ORIGINAL_FORMAT)
+        convert_dropdown = ctk.CTkOptionMenu(
+            convert_frame,
+            variable=self.convert_var,
+            values=[ORIGINAL_FORMAT] + list(AUDIO_CODECS)
+        )
+        convert_dropdown.pack(side=tk.LEFT, padx=10)
+        
+        self.keep_original_var = tk.BooleanVar(value=False)
+        keep_original_check = ctk.CTkCheckBox(
+            convert_frame,
+            text="Keep original",
+            variable=self.keep_original_var
+        )
+        keep_original_check.pack(side=tk.LEFT, padx=10)
+        
         # Download Location Frame
         location_frame = ctk.CTkFrame(self.main_frame)
         location_frame.pack(fill=tk.X, pady=10)
@@ -172,22 +235,20 @@ class YouTubeAudioDownloader:
         Returns:
             bool: True if the URL is valid, False otherwise
         """
-        # YouTube URL regex pattern
-        youtube_regex = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-        
-        match = re.match(youtube_regex, url)
-        return match is not None
+        return canonical_video_id(url) is not None
     
     def check_url(self):
         """Validate the URL and fetch video information if valid."""
-        url = self.url_entry.get().strip()
+        # Several URLs separated by spaces are fetched together; the first is shown
+        urls = self.url_entry.get().split()
         
-        if not url:
+        if not urls:
             messagebox.showerror("Error", "Please enter a YouTube URL")
             return
         
-        if not self.validate_youtube_url(url):
-            messagebox.showerror("Error", "Invalid YouTube URL")
+        invalid = [url for url in urls if not self.validate_youtube_url(url)]
+        if invalid:
+            messagebox.showerror("Error", f"Invalid YouTube URL: {invalid[0]}")
             return
         
         # Update status
@@ -195,35 +256,24 @@ class YouTubeAudioDownloader:
         self.root.update_idletasks()
         
         # Start a thread to fetch video info to prevent UI freeze
-        threading.Thread(target=self._fetch_video_info, args=(url,), daemon=True).start()
+        threading.Thread(target=self._fetch_video_info, args=(urls,), daemon=True).start()
     
-    def _fetch_video_info(self, url: str):
+    def _fetch_video_info(self, urls: List[str]):
         """
         Fetch video information in a separate thread.
         
+        The other videos are loaded alongside the first and cached, so
+        checking them next needs no network round trip.
+        
         Args:
-            url: The YouTube URL to process
+            urls: The YouTube URLs to process; the first one is shown
         """
         try:
-            # Create YouTube object with retry mechanism
-            try_count = 0
-            max_retries = 3
-            
-            while try_count < max_retries:
-                try:
-                    self.yt = YouTube(
-                        url,
-                        on_progress_callback=self._on_progress,
-                        on_complete_callback=self._on_complete
-                    )
-                    break  # Success, exit the retry loop
-                except Exception as retry_e:
-                    try_count += 1
-                    if try_count >= max_retries:
-                        raise retry_e  # Re-raise if all retries failed
-                    # Wait before retrying (increasing delay with each retry)
-                    import time
-                    time.sleep(1 * try_count)
+            # Use cached manifests or load the videos
+            manifest = self.fetch_manifests(urls)[urls[0]]
+            if isinstance(manifest, Exception):
+                raise manifest
+            self.manifest = manifest
             
             # Get available audio streams
             self.audio_streams = self._get_audio_streams()
@@ -242,6 +292,85 @@ class YouTubeAudioDownloader:
                                 "Try updating pytube with: pip install --upgrade pytube"
             self.root.after(0, lambda: self._show_error(error_message))
     
+    def _load_video(self, url: str) -> YouTube:
+        """
+        Create a YouTube object and fetch its metadata and stream manifest.
+        
+        pytube fetches lazily, so the title and streams are touched here to
+        make network errors surface inside the retry policy.
+        
+        Args:
+            url: The YouTube URL to load
+            
+        Returns:
+            The loaded YouTube object
+        """
+        yt = YouTube(url)
+        with tracer.span("metadata", video_id=yt.video_id):
+            yt.title
+        with tracer.span("decipher", video_id=yt.video_id):
+            yt.streams
+        return yt
+    
+    def _get_manifest(self, url: str, refresh: bool = False) -> VideoManifest:
+        """
+        Get the stream manifest of a video, from the cache when possible.
+        
+        On a miss the video is loaded with pytube, retrying transient
+        failures with backoff, and the result is cached.
+        
+        Args:
+            url: The YouTube URL
+            refresh: Ignore any cached manifest
+            
+        Returns:
+            The video's audio stream manifest
+        """
+        video_id = canonical_video_id(url)
+        manifest = None if refresh else self.manifest_cache.get(video_id)
+        if manifest is None:
+            with tracer.span("fetch_video", video_id=video_id) as span:
+                yt = FETCH_RETRY_POLICY.call(
+                    self._load_video,
+                    url,
+                    on_retry=lambda attempt, error, delay: span.set(retries=attempt, last_error=str(error))
+                )
+                manifest = manifest_from_youtube(yt)
+            self.manifest_cache.put(manifest)
+        return manifest
+    
+    def fetch_manifests(
+        self, urls: List[str], max_workers: int = 4
+    ) -> Dict[str, Union[VideoManifest, Exception]]:
+        """
+        Get the manifests of several videos concurrently on a small thread pool.
+        
+        Each video goes through _get_manifest, so cached manifests are
+        reused and newly loaded ones are cached. URLs of the same video are
+        loaded only once.
+        
+        Args:
+            urls: The YouTube URLs to load
+            max_workers: Number of concurrent fetches
+            
+        Returns:
+            Mapping of URL to its manifest, or the error that stopped it
+        """
+        def load(url):
+            try:
+                return self._get_manifest(url)
+            except Exception as e:
+                return e
+        
+        # One URL per video id
+        first_urls = {}
+        for url in urls:
+            first_urls.setdefault(canonical_video_id(url), url)
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(first_urls))) as executor:
+            results = dict(zip(first_urls, executor.map(load, first_urls.values())))
+        return {url: results[canonical_video_id(url)] for url in urls}
+    
     def _get_audio_streams(self) -> List[Tuple[str, str]]:
         """
         Get available audio streams for the video.
@@ -251,10 +380,8 @@ class YouTubeAudioDownloader:
         """
         streams = []
         
-        # Filter audio-only streams
-        audio_streams = self.yt.streams.filter(only_audio=True).order_by('abr').desc()
-        
-        for stream in audio_streams:
+        # The manifest holds audio-only streams, highest bitrate first
+        for stream in self.manifest.streams:
             # Get attributes
             abr = stream.abr if stream.abr else "Unknown bitrate"
             mime_type = stream.mime_type if stream.mime_type else "Unknown format"
@@ -268,12 +395,12 @@ class YouTubeAudioDownloader:
     
     def _update_ui_with_video_info(self):
         """Update UI with fetched video information."""
-        if not self.yt or not self.audio_streams:
+        if not self.manifest or not self.audio_streams:
             self._show_error("Failed to fetch video information")
             return
         
         # Display video title
-        self.title_var.set(self.yt.title)
+        self.title_var.set(self.manifest.title)
         
         # Show info frame
         self.info_frame.pack(fill=tk.X, pady=10, after=self.url_entry.winfo_parent())
@@ -297,7 +424,7 @@ class YouTubeAudioDownloader:
     
     def download_audio(self):
         """Start the audio download process."""
-        if not self.yt or not self.audio_streams:
+        if not self.manifest or not self.audio_streams:
             messagebox.showerror("Error", "No video information available")
             return
         
@@ -326,37 +453,70 @@ class YouTubeAudioDownloader:
         self.progress_bar.set(0)
         
         # Start download in a separate thread
+        codec = self.convert_var.get()
         threading.Thread(
             target=self._download_audio_thread,
-            args=(selected_itag,),
+            args=(selected_itag, None if codec == ORIGINAL_FORMAT else codec, self.keep_original_var.get()),
             daemon=True
         ).start()
     
-    def _download_audio_thread(self, itag: str):
+    def _download_audio_thread(self, itag: str, codec: Optional[str] = None, keep_original: bool = False):
         """
         Download audio in a separate thread.
         
         Args:
             itag: The itag of the stream to download
+            codec: Encode to this AUDIO_CODECS entry while downloading (None to keep the stream as is)
+            keep_original: When encoding, also save the unconverted stream
         """
         try:
+            # Stream URLs are only signed for a few hours; reload a lapsed manifest
+            video_id = self.manifest.video_id
+            if self.manifest_cache.get(video_id) is None:
+                self.manifest = self._get_manifest(self._watch_url(video_id), refresh=True)
+            
             # Get the stream by itag
-            stream = self.yt.streams.get_by_itag(int(itag))
+            stream = self.manifest.get(int(itag))
             if not stream:
                 self.root.after(0, lambda: self._show_error("Selected stream is not available"))
                 return
             
-            # Get file extension
-            extension = stream.mime_type.split('/')[-1]
+            # The unconverted stream is stored under the bare itag, conversions under itag:codec
+            title = self.manifest.title
+            original_name = media_filename(title, video_id, itag, stream.mime_type.split('/')[-1])
             
-            # Download the audio file
+            # Download the audio file (or reuse one we already have)
             self.root.after(0, lambda: self.status_var.set("Downloading..."))
-            stream.download(
-                output_path=self.download_dir,
-                filename=f"{self.yt.title}.{extension}"
-            )
+            file_path = None
+            if codec:
+                filename = media_filename(title, video_id, itag, AUDIO_CODECS[codec][1])
+                if original_name == filename:
+                    original_name += ".orig"
+                # Save the unconverted stream alongside the conversion unless it is already stored
+                tee_name = None
+                if keep_original and self.download_store.get(video_id, itag) is None:
+                    tee_name = original_name
+                file_path, downloaded = self.download_store.fetch(
+                    video_id,
+                    f"{itag}:{codec}",
+                    self.download_dir,
+                    lambda: self._download_stream(video_id, int(itag), filename, codec, tee_name)
+                )
+                if downloaded and tee_name:
+                    self.download_store.record(video_id, itag, os.path.join(self.download_dir, tee_name))
+            
+            # Reuses the file saved during conversion, or downloads it if a
+            # stored conversion meant no download ran
+            if keep_original or not codec:
+                original_path, _ = self.download_store.fetch(
+                    video_id,
+                    itag,
+                    self.download_dir,
+                    lambda: self._download_stream(video_id, int(itag), original_name)
+                )
+                file_path = file_path or original_path
             
-            # Note: The on_complete_callback will handle completion
+            self._on_complete(stream, file_path)
             
         except Exception as e:
             # Handle exceptions on the main thread
@@ -364,19 +524,114 @@ class YouTubeAudioDownloader:
             self.root.after(0, lambda: self._show_error(error_message))
             self.root.after(0, self._enable_controls)
     
+    @staticmethod
+    def _watch_url(video_id: str) -> str:
+        """Return the watch page URL of a video."""
+        return f"https://www.youtube.com/watch?v={video_id}"
+    
+    def _download_stream(
+        self,
+        video_id: str,
+        itag: int,
+        filename: str,
+        codec: Optional[str] = None,
+        tee_filename: Optional[str] = None
+    ) -> str:
+        """
+        Download a stream of the current manifest.
+        
+        If YouTube rejects the cached URL, the manifest is reloaded once and
+        the download retried with the fresh URL.
+        
+        Args:
+            video_id: The YouTube video id
+            itag: The itag of the stream to download
+            filename: Name of the file to create in the download directory
+            codec: Encode to this codec while downloading (None to keep the stream as is)
+            tee_filename: When encoding, also save the unconverted stream under this name
+            
+        Returns:
+            Path to the downloaded file
+        """
+        try:
+            return self._transfer_stream(self.manifest.get(itag), filename, codec, tee_filename)
+        except HTTPError as e:
+            if e.code != 403:
+                raise
+            self.manifest_cache.invalidate(video_id)
+            self.manifest = self._get_manifest(self._watch_url(video_id), refresh=True)
+            stream = self.manifest.get(itag)
+            if not stream:
+                raise
+            return self._transfer_stream(stream, filename, codec, tee_filename)
+    
+    def _transfer_stream(
+        self,
+        stream: StreamEntry,
+        filename: str,
+        codec: Optional[str] = None,
+        tee_filename: Optional[str] = None
+    ) -> str:
+        """
+        Download a stream while drawing from the shared bandwidth budget.
+        
+        When a codec is given, chunks are piped into an encoder as they
+        arrive, so only the converted file is written and encoding overlaps
+        the download.
+        
+        The file is written under a temporary name with its size
+        preallocated, and only appears under filename once complete.
+        
+        Args:
+            stream: The manifest entry to download
+            filename: Name of the file to create in the download directory
+            codec: Encode to this codec while downloading (None to keep the stream as is)
+            tee_filename: When encoding, also save the unconverted stream under this name
+            
+        Returns:
+            Path to the downloaded file
+        """
+        os.makedirs(self.download_dir, exist_ok=True)
+        file_path = os.path.join(self.download_dir, filename)
+        
+        if codec:
+            tee_path = os.path.join(self.download_dir, tee_filename) if tee_filename else None
+            sink = StreamingEncoder(file_path, codec, tee_path=tee_path, tee_size=stream.filesize)
+        else:
+            sink = AtomicWriter(file_path, stream.filesize)
+        
+        self.bandwidth_job = bandwidth_manager.register(filename)
+        try:
+            bytes_remaining = stream.filesize
+            with tracer.span("transfer", itag=stream.itag, codec=codec) as span, sink:
+                for chunk in stream_media(stream.url):
+                    sink.write(chunk)
+                    bytes_remaining -= len(chunk)
+                    self._on_progress(stream, chunk, bytes_remaining)
+                span.set(bytes=stream.filesize - bytes_remaining)
+        finally:
+            self.bandwidth_job.close()
+            self.bandwidth_job = None
+        
+        return file_path
+    
     def _on_progress(self, stream, chunk, bytes_remaining):
         """
         Callback for download progress.
         
         Args:
-            stream: The stream being downloaded
+            stream: The manifest entry being downloaded
             chunk: The chunk that was just downloaded
             bytes_remaining: Bytes remaining to be downloaded
         """
+        # Block until the chunk fits the shared bandwidth budget
+        if self.bandwidth_job:
+            self.bandwidth_job.consume(len(chunk))
+        
         # Calculate progress percentage
         total_size = stream.filesize
         bytes_downloaded = total_size - bytes_remaining
-        percentage = bytes_downloaded / total_size
+        percentage = bytes_downloaded / total_size if total_size else 0.0
         
         # Update UI on the main thread
         self.root.after(0, lambda: self._update_progress(percentage))
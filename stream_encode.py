@@ -0,0 +1,179 @@
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from typing import Optional
+
+from atomic_write import DEFAULT_FSYNC, AtomicWriter, create_temp, sync_file
+from postprocess import AUDIO_CODECS, FFMPEG
+
+# Bytes buffered between the download and the encoder before write() blocks
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+
+# Chunks are split into pieces of at most this size before they are buffered,
+# so the buffer is bounded in bytes whatever size the downloader reads
+PIECE_SIZE = 64 * 1024
+
+
+class StreamingEncoder:
+    """
+    Encodes audio while it downloads by piping chunks into ffmpeg's stdin.
+
+    Chunks pass through a bounded buffer to a writer thread, so the
+    download only blocks when the encoder falls behind. Only the encoded
+    file is written to disk, plus an optional tee of the raw stream when
+    the original must be kept. Both are written under temporary names and
+    renamed into place once complete. Use as a context manager: leaving the
+    block normally finishes the encode, leaving it with an exception aborts it.
+    """
+
+    def __init__(
+        self,
+        output_path: str,
+        codec: str = "mp3",
+        bitrate: str = "192k",
+        buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+        tee_path: Optional[str] = None,
+        tee_size: Optional[int] = None,
+        fsync: str = DEFAULT_FSYNC,
+    ):
+        """
+        Start the encoder subprocess.
+
+        Args:
+            output_path: The encoded file to create
+            codec: One of postprocess.AUDIO_CODECS
+            bitrate: Target audio bitrate
+            buffer_bytes: Bytes held in memory before write() blocks
+            tee_path: Also write the raw stream to this file (None to skip)
+            tee_size: Expected size of the raw stream, preallocated for the tee
+            fsync: atomic_write fsync policy for the finished files
+        """
+        encoder, _ = AUDIO_CODECS[codec]
+        self.output_path = output_path
+        self.tee_path = tee_path
+        self.fsync = fsync
+        self.bytes_in = 0
+
+        # ffmpeg overwrites the temporary file; it is renamed into place by close()
+        fd, self._temp_path = create_temp(output_path)
+        os.close(fd)
+
+        args = [FFMPEG, "-hide_banner", "-loglevel", "error", "-y",
+                "-i", "pipe:0", "-vn", "-c:a", encoder]
+        if codec != "flac":
+            args += ["-b:a", bitrate]
+
+        self._stderr = None
+        self._process = None
+        try:
+            self._stderr = tempfile.TemporaryFile()
+            self._process = subprocess.Popen(
+                args + [self._temp_path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=self._stderr,
+            )
+            self._tee = AtomicWriter(tee_path, tee_size, fsync=fsync) if tee_path else None
+        except BaseException:
+            # e.g. ffmpeg is missing, or the tee cannot preallocate (disk full)
+            if self._process:
+                self._process.kill()
+                self._process.stdin.close()
+                self._process.wait()
+            if self._stderr:
+                self._stderr.close()
+            os.remove(self._temp_path)
+            raise
+        self._buffer: "queue.Queue" = queue.Queue(maxsize=max(1, buffer_bytes // PIECE_SIZE))
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._pump, daemon=True)
+        self._writer.start()
+
+    def _pump(self):
+        """Feed buffered chunks into ffmpeg until the end-of-stream marker."""
+        try:
+            while True:
+                chunk = self._buffer.get()
+                if chunk is None:
+                    break
+                if self._error is None:
+                    self._process.stdin.write(chunk)
+        except OSError as e:
+            # ffmpeg exited early; keep draining so write() never blocks forever
+            self._error = e
+            while self._buffer.get() is not None:
+                pass
+        finally:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+
+    def write(self, chunk: bytes):
+        """
+        Hand a downloaded chunk to the encoder.
+
+        Args:
+            chunk: The bytes just downloaded
+        """
+        if self._error is not None:
+            raise RuntimeError(f"Encoder stopped accepting data: {self._error_message()}")
+        if self._tee:
+            self._tee.write(chunk)
+        self.bytes_in += len(chunk)
+        # Copies, not views, so a large chunk is not kept alive by its last piece
+        for offset in range(0, len(chunk), PIECE_SIZE):
+            self._buffer.put(chunk[offset:offset + PIECE_SIZE])
+
+    def _error_message(self) -> str:
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", "replace").strip()[-500:]
+
+    def close(self) -> str:
+        """
+        Finish the encode and wait for ffmpeg to exit.
+
+        Returns:
+            Path to the encoded file
+        """
+        self._buffer.put(None)
+        self._writer.join()
+        returncode = self._process.wait()
+        message = self._error_message()
+        self._stderr.close()
+        if returncode != 0:
+            self._discard()
+            raise RuntimeError(f"ffmpeg failed: {message}")
+
+        os.replace(self._temp_path, self.output_path)
+        sync_file(self.output_path, self.fsync)
+        if self._tee:
+            self._tee.commit()
+        return self.output_path
+
+    def abort(self):
+        """Stop ffmpeg and remove any partial output."""
+        self._error = self._error or RuntimeError("aborted")
+        self._process.kill()
+        self._buffer.put(None)
+        self._writer.join()
+        self._process.wait()
+        self._stderr.close()
+        self._discard()
+
+    def _discard(self):
+        if self._tee:
+            self._tee.abort()
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionMiddleware
+
+
+def _call(middleware, path="/generate-layout"):
+    """Send one request through the middleware; return (status, headers)."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await middleware({"type": "http", "path": path}, receive, send)
+
+    return run(), sent
+
+
+def _status(sent):
+    start = sent[0]
+    return start["status"], dict(start["headers"])
+
+
+def _holding_app(hold):
+    async def app(scope, receive, send):
+        await asyncio.sleep(hold)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+def test_admits_requests_from_successive_event_loops():
+    controller = AdmissionController(queue_timeout=0.1)
+
+    async def one():
+        admitted = await controller.acquire()
+        controller.release()
+        return admitted
+
+    results = []
+    for _ in range(3):
+        results.append(asyncio.run(one()))
+        time.sleep(0.2)
+
+    assert results == [True, True, True]
+    assert controller.shed == 0
+
+
+def test_sheds_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=0, retry_after=2.5)
+    middleware = AdmissionMiddleware(_holding_app(0.1), controller)
+
+    async def run():
+        first, first_sent = _call(middleware)
+        second, second_sent = _call(middleware)
+        await asyncio.gather(first, second)
+        return first_sent, second_sent
+
+    first_sent, second_sent = asyncio.run(run())
+
+    assert _status(first_sent)[0] == 200
+    status, headers = _status(second_sent)
+    assert status == 503
+    assert headers[b"retry-after"] == b"3"
+    assert controller.stats()["shed"] == 1
+    assert controller.stats()["queued"] == 0
+
+
+def test_sheds_after_queue_timeout():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=0.05)
+    middleware = AdmissionMiddleware(_holding_app(0.3), controller)
+
+    async def run():
+        first, first_sent = _call(middleware)
+        second, second_sent = _call(middleware)
+        await asyncio.gather(first, second)
+        return first_sent, second_sent
+
+    first_sent, second_sent = asyncio.run(run())
+
+    assert _status(first_sent)[0] == 200
+    status, headers = _status(second_sent)
+    assert status == 503
+    assert headers[b"retry-after"] == b"1"
+    stats = controller.stats()
+    assert (stats["admitted"], stats["queued"], stats["shed"]) == (1, 1, 1)
+    assert (stats["active"], stats["waiting"]) == (0, 0)
+
+
+def test_freed_slot_goes_to_oldest_waiter():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, queue_timeout=1)
+    order = []
+
+    async def request(name, hold):
+        assert await controller.acquire()
+        order.append(name)
+        await asyncio.sleep(hold)
+        controller.release()
+
+    async def run():
+        first = asyncio.ensure_future(request("first", 0.05))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(request("second", 0))
+        await asyncio.sleep(0)
+        third = asyncio.ensure_future(request("third", 0))
+        await asyncio.gather(first, second, third)
+
+    asyncio.run(run())
+    assert order == ["first", "second", "third"]
+    assert controller.active == 0
+
+
+def test_exempt_paths_bypass_admission():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+    middleware = AdmissionMiddleware(_holding_app(0), controller)
+    controller.active = 1  # Every slot busy
+
+    run, sent = _call(middleware, "/metrics")
+    asyncio.run(run)
+
+    assert _status(sent)[0] == 200
+    assert controller.shed == 0
+
+
+def test_generate_layout_twice_with_test_client():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from main import app
+
+    # Without "with", TestClient runs every request on a fresh event loop
+    client = TestClient(app)
+    payload = {"app_purpose": "inventory", "features": ["Gallery"]}
+    first = client.post("/generate-layout", json=payload)
+    time.sleep(0.2)
+    second = client.post("/generate-layout", json=payload)
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json()["layout"][0]["screen"] == "Browse"
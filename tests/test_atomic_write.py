@@ -0,0 +1,76 @@
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+
+from atomic_write import AtomicWriter, create_temp, media_filename, sync_file
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX permissions")
+def test_temporary_file_gets_umask_permissions(tmp_path):
+    previous = os.umask(0o027)
+    try:
+        fd, temp_path = create_temp(str(tmp_path / "Song [abc.140].m4a"))
+    finally:
+        os.umask(previous)
+    os.close(fd)
+
+    name = os.path.basename(temp_path)
+    assert name.startswith(".Song [abc.140].") and name.endswith(".part.m4a")
+    assert stat.S_IMODE(os.stat(temp_path).st_mode) == 0o640
+
+
+def test_commit_moves_file_into_place(tmp_path):
+    path = tmp_path / "video.mp4"
+    with AtomicWriter(str(path), expected_size=1 << 20) as f:
+        f.write(b"abc")
+        assert not path.exists()
+
+    assert path.read_bytes() == b"abc"
+    assert os.listdir(tmp_path) == ["video.mp4"]
+
+
+def test_abort_keeps_existing_file(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with AtomicWriter(str(path)) as f:
+            f.write(b"new")
+            raise RuntimeError()
+
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["video.mp4"]
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"abc")
+
+    with pytest.raises(ValueError):
+        sync_file(str(path), "sometimes")
+    with pytest.raises(ValueError):
+        AtomicWriter(str(path), fsync="sometimes")
+
+
+def test_unknown_fsync_policy_in_environment_fails_at_import():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import atomic_write"],
+        cwd=root,
+        env=dict(os.environ, DOWNLOAD_FSYNC="alwyas"),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "DOWNLOAD_FSYNC must be one of never, close, always" in result.stderr
+
+
+def test_media_filename():
+    assert media_filename("Song", "dQw4w9WgXcQ", 140, "m4a") == "Song [dQw4w9WgXcQ.140].m4a"
+    assert media_filename('a/b:c?', "dQw4w9WgXcQ", "18", "mp4") == "a_b_c_ [dQw4w9WgXcQ.18].mp4"
+    long_name = media_filename("é" * 300, "dQw4w9WgXcQ", 140, "m4a")
+    assert len(long_name.encode("utf-8")) <= 200
+    assert long_name.endswith(" [dQw4w9WgXcQ.140].m4a")
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+import bandwidth
+from bandwidth import BandwidthManager
+
+CHUNK = 16 * 1024
+
+
+def _transfer(job, nbytes):
+    start = time.monotonic()
+    for _ in range(nbytes // CHUNK):
+        job.consume(CHUNK)
+    return time.monotonic() - start
+
+
+def test_idle_job_leaves_its_share_to_active_jobs():
+    manager = BandwidthManager(rate=1_000_000, burst_seconds=0.05)
+    idle = manager.register("resolving metadata")
+    active = manager.register("downloading")
+
+    elapsed = _transfer(active, 500_000)
+
+    # The whole limit, not half of it
+    assert 0.4 < elapsed < 0.7
+    report = manager.report()
+    assert report["downloading"]["allowed"] == pytest.approx(1_000_000)
+    assert report["resolving metadata"]["allowed"] == pytest.approx(500_000)
+    idle.close()
+    active.close()
+
+
+def test_active_jobs_split_the_rate_by_weight():
+    manager = BandwidthManager(rate=1_200_000, burst_seconds=0.05)
+    light = manager.register("light", weight=1)
+    heavy = manager.register("heavy", weight=2)
+    elapsed = {}
+
+    def run(name, job, nbytes):
+        elapsed[name] = _transfer(job, nbytes)
+
+    # Same finishing time when sizes follow the weights: 1.2 MB at 1.2 MB/s
+    threads = [
+        threading.Thread(target=run, args=("light", light, 400_000)),
+        threading.Thread(target=run, args=("heavy", heavy, 800_000)),
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    report = manager.report()
+    for thread in threads:
+        thread.join()
+
+    assert report["light"]["allowed"] == pytest.approx(400_000)
+    assert report["heavy"]["allowed"] == pytest.approx(800_000)
+    assert 0.8 < elapsed["light"] < 1.4
+    assert 0.8 < elapsed["heavy"] < 1.4
+
+
+def test_job_goes_idle_after_a_pause(monkeypatch):
+    monkeypatch.setattr(bandwidth, "IDLE_AFTER", 0.1)
+    manager = BandwidthManager(rate=1_000_000)
+    first = manager.register("first")
+    second = manager.register("second")
+
+    first.consume(1)
+    assert manager.report()["second"]["allowed"] == pytest.approx(500_000)
+    time.sleep(0.15)
+    assert manager.report()["second"]["allowed"] == pytest.approx(1_000_000)
+
+
+def test_unlimited_manager_never_blocks():
+    manager = BandwidthManager(rate=None)
+    with manager.register("job") as job:
+        assert _transfer(job, 10_000_000) < 0.5
+        assert manager.report()["job"]["allowed"] is None
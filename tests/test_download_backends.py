@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+import http_pool
+from bandwidth import BandwidthManager
+from benchmarks.fixture_server import FixtureServer
+from download_backends import BACKENDS, PytubeBackend, get_backend
+
+
+@pytest.fixture
+def no_proxy_env(monkeypatch):
+    for name in ("http_proxy", "https_proxy", "all_proxy", "no_proxy",
+                 "HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_pytube_transfer_is_paced_in_small_chunks(tmp_path, no_proxy_env, monkeypatch, pooled):
+    request = pytest.importorskip("pytube.request")
+    if pooled:
+        monkeypatch.setattr(request, "_execute_request", http_pool.pooled_execute_request)
+    rate = 2_000_000
+    size = 3_000_000
+    manager = BandwidthManager(rate=rate, burst_seconds=0.05)
+    backend = PytubeBackend(bandwidth=manager)
+    progress = []
+
+    with FixtureServer() as server:
+        start = time.monotonic()
+        path = backend.transfer(server.url(size), str(tmp_path / "media.bin"),
+                                lambda downloaded, total: progress.append((time.monotonic(), downloaded)))
+        elapsed = time.monotonic() - start
+
+    with open(path, "rb") as f:
+        assert f.read() == (bytes(range(256)) * (size // 256 + 1))[:size]
+
+    # The whole range would arrive in one burst if pytube's read() were used
+    steps = [b - a for (_, a), (_, b) in zip([(start, 0)] + progress, progress)]
+    assert max(steps) <= http_pool.STREAM_CHUNK_SIZE
+    assert size / rate * 0.8 < elapsed < size / rate * 1.5
+
+    # Bytes arrive throughout the transfer, not all in the first half
+    halfway = next(t for t, downloaded in progress if downloaded >= size // 2)
+    assert halfway - start > elapsed * 0.35
+    # The bandwidth job is closed once the transfer ends
+    assert set(manager.report()) == {"total"}
+
+
+def test_constructing_pytube_backend_leaves_pytube_alone(monkeypatch):
+    request = pytest.importorskip("pytube.request")
+    execute, stream = object(), object()
+    monkeypatch.setattr(request, "_execute_request", execute)
+    monkeypatch.setattr(request, "stream", stream)
+
+    PytubeBackend()
+
+    assert request._execute_request is execute
+    assert request.stream is stream
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown backend: nope"):
+        get_backend("nope")
+
+
+def test_constructor_errors_are_not_reported_as_unknown_backends(monkeypatch):
+    class BrokenBackend:
+        def __init__(self, bandwidth=None):
+            raise KeyError("missing setting")
+
+    monkeypatch.setitem(BACKENDS, "broken", BrokenBackend)
+
+    with pytest.raises(KeyError, match="missing setting"):
+        get_backend("broken")
@@ -0,0 +1,154 @@
+import errno
+import os
+import threading
+
+import pytest
+
+import download_store
+from download_store import DownloadStore, file_sha256
+
+PAYLOAD = os.urandom(256 * 1024)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DownloadStore(str(tmp_path / "index.sqlite3"))
+
+
+def _stored(store, tmp_path, video_id="dQw4w9WgXcQ", format_id="18"):
+    source_dir = tmp_path / "library"
+    source_dir.mkdir(exist_ok=True)
+    path = source_dir / f"Video [{video_id}.{format_id}].mp4"
+    path.write_bytes(PAYLOAD)
+    return store.record(video_id, format_id, str(path))
+
+
+def _run_concurrently(target, threads=8):
+    barrier = threading.Barrier(threads)
+    results, errors = [], []
+
+    def run():
+        barrier.wait()
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results, errors
+
+
+def test_fetch_downloads_once_for_concurrent_requests(store, tmp_path):
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def download():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        path = tmp_path / "out" / "Video [abc.18].mp4"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(PAYLOAD)
+        return str(path)
+
+    def fetch():
+        return store.fetch("abc", "18", str(tmp_path / "out"), download)
+
+    threading.Timer(0.2, release.set).start()
+    results, errors = _run_concurrently(fetch, threads=5)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert sorted(fetched for _, fetched in results) == [False] * 4 + [True]
+    assert len({path for path, _ in results}) == 1
+
+
+def test_fetch_reuses_indexed_file(store, tmp_path):
+    record = _stored(store, tmp_path)
+
+    path, fetched = store.fetch(record.video_id, record.format_id, str(tmp_path / "elsewhere"),
+                                lambda: pytest.fail("should not download"))
+
+    assert not fetched
+    assert open(path, "rb").read() == PAYLOAD
+
+
+@pytest.mark.parametrize("hardlinks", [True, False])
+def test_concurrent_materialize_keeps_original_intact(store, tmp_path, monkeypatch, hardlinks):
+    record = _stored(store, tmp_path)
+    dest = str(tmp_path / "dest")
+
+    if not hardlinks:
+        def no_link(src, dst):
+            raise OSError(errno.EXDEV, "cross-device link")
+        monkeypatch.setattr(download_store.os, "link", no_link)
+
+    for _ in range(20):
+        results, errors = _run_concurrently(lambda: store.materialize(record, dest))
+        assert errors == []
+        assert len(set(results)) == 1
+        assert file_sha256(record.path) == record.sha256
+        assert open(results[0], "rb").read() == PAYLOAD
+        os.remove(results[0])
+
+    assert sorted(os.listdir(dest)) == []
+
+
+def test_materialize_replaces_stale_file(store, tmp_path):
+    record = _stored(store, tmp_path)
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    stale = dest / os.path.basename(record.path)
+    stale.write_bytes(b"partial")
+
+    path = store.materialize(record, str(dest))
+
+    assert open(path, "rb").read() == PAYLOAD
+    assert file_sha256(record.path) == record.sha256
+
+
+def test_get_drops_records_of_missing_files(store, tmp_path):
+    record = _stored(store, tmp_path)
+    os.remove(record.path)
+
+    assert store.get(record.video_id, record.format_id) is None
+    assert store.get(record.video_id, record.format_id) is None
+
+
+def test_connections_are_closed(tmp_path, monkeypatch):
+    opened = []
+    connect = download_store.sqlite3.connect
+
+    class TrackedConnection:
+        def __init__(self, *args, **kwargs):
+            self._conn = connect(*args, **kwargs)
+            self.closed = False
+            opened.append(self)
+
+        def close(self):
+            self.closed = True
+            self._conn.close()
+
+        def __getattr__(self, name):
+            return getattr(self._conn, name)
+
+        def __enter__(self):
+            return self._conn.__enter__()
+
+        def __exit__(self, *exc):
+            return self._conn.__exit__(*exc)
+
+    monkeypatch.setattr(download_store.sqlite3, "connect", TrackedConnection)
+    store = DownloadStore(str(tmp_path / "index.sqlite3"))
+    record = _stored(store, tmp_path)
+    assert store.get(record.video_id, record.format_id) == record
+    store.forget(record.video_id, record.format_id)
+    assert store.get(record.video_id, record.format_id) is None
+
+    assert len(opened) == 5
+    assert all(conn.closed for conn in opened)
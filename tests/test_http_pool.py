@@ -0,0 +1,116 @@
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_pool
+from benchmarks.fixture_server import FixtureServer
+from http_pool import ConnectionPool, pooled_execute_request, stream_media, uses_proxy
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.paths = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def no_proxy_env(monkeypatch):
+    for name in ("http_proxy", "https_proxy", "all_proxy", "no_proxy",
+                 "HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_pool_reuses_connections(server, no_proxy_env):
+    pool = ConnectionPool()
+    url = f"http://127.0.0.1:{server.server_port}/a"
+    for _ in range(3):
+        assert pool.request("GET", url).read() == b"ok"
+    assert (pool.created, pool.reused) == (1, 2)
+    pool.close()
+
+
+def test_proxied_requests_bypass_the_pool(server, no_proxy_env, monkeypatch):
+    monkeypatch.setenv("http_proxy", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(http_pool, "shared_pool", ConnectionPool())
+    # urlopen() keeps the proxy settings it saw first
+    monkeypatch.setattr(urllib.request, "_opener", None)
+
+    url = "http://video.example.invalid/watch?v=x"
+    assert uses_proxy(url)
+    assert pooled_execute_request(url).read() == b"ok"
+
+    # The proxy saw the absolute URL, and the pool was never used
+    assert server.paths == [url]
+    assert http_pool.shared_pool.created == 0
+
+
+def test_no_proxy_hosts_use_the_pool(server, no_proxy_env, monkeypatch):
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:9")
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+    monkeypatch.setattr(http_pool, "shared_pool", ConnectionPool())
+
+    url = f"http://127.0.0.1:{server.server_port}/b"
+    assert not uses_proxy(url)
+    assert pooled_execute_request(url).read() == b"ok"
+    assert server.paths == ["/b"]
+    assert http_pool.shared_pool.created == 1
+
+
+def test_stream_media_reads_ranges_in_bounded_chunks(no_proxy_env, monkeypatch):
+    monkeypatch.setattr(http_pool, "RANGE_SIZE", 100_000)
+    monkeypatch.setattr(http_pool, "shared_pool", ConnectionPool())
+    size = 250_000
+
+    with FixtureServer() as server:
+        chunks = list(stream_media(server.url(size), chunk_size=16 * 1024))
+
+    assert b"".join(chunks) == (bytes(range(256)) * (size // 256 + 1))[:size]
+    assert max(len(chunk) for chunk in chunks) <= 16 * 1024
+    # The size probe runs while the first range is open; the later ranges reuse connections
+    assert (http_pool.shared_pool.created, http_pool.shared_pool.reused) == (2, 2)
+
+
+def test_stream_media_reads_only_when_asked(no_proxy_env, monkeypatch):
+    monkeypatch.setattr(http_pool, "shared_pool", ConnectionPool())
+    reads = []
+
+    def execute(url, method=None, timeout=None):
+        response = pooled_execute_request(url, method=method, timeout=timeout)
+        read = response.read
+
+        def counted_read(amt=None):
+            reads.append(amt)
+            return read(amt)
+
+        response.read = counted_read
+        return response
+
+    with FixtureServer() as server:
+        chunks = stream_media(server.url(1_000_000), chunk_size=1000, execute=execute)
+        next(chunks)
+        next(chunks)
+        chunks.close()
+
+    assert reads == [1000, 1000]
@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+
+from manifest_cache import EXPIRY_MARGIN, ManifestCache, StreamEntry, VideoManifest, url_expiry
+
+
+def _manifest(video_id="dQw4w9WgXcQ", lifetime=3600):
+    now = time.time()
+    url = f"https://rr1.googlevideo.com/videoplayback?expire={int(now + lifetime)}&itag=140"
+    return VideoManifest(
+        video_id=video_id,
+        title="Song",
+        streams=[StreamEntry(140, "128kbps", "audio/mp4", 1000, url, url_expiry(url, now))],
+        fetched_at=now,
+    )
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    manifest = _manifest()
+    ManifestCache(cache_dir=str(tmp_path)).put(manifest)
+
+    assert ManifestCache(cache_dir=str(tmp_path)).get(manifest.video_id) == manifest
+    assert os.listdir(tmp_path) == [f"{manifest.video_id}.json"]
+
+
+def test_expiring_manifests_are_misses(tmp_path):
+    cache = ManifestCache(cache_dir=str(tmp_path))
+    manifest = _manifest(lifetime=EXPIRY_MARGIN - 10)
+    cache.put(manifest)
+
+    assert cache.get(manifest.video_id) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_puts_of_one_video(tmp_path):
+    cache = ManifestCache(cache_dir=str(tmp_path))
+    manifest = _manifest()
+    errors = []
+
+    def put_many():
+        try:
+            for _ in range(100):
+                cache.put(manifest)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert os.listdir(tmp_path) == [f"{manifest.video_id}.json"]
+    assert ManifestCache(cache_dir=str(tmp_path)).get(manifest.video_id) == manifest
+
+
+def test_memory_tier_is_bounded():
+    cache = ManifestCache(max_entries=2)
+    for video_id in ("aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"):
+        cache.put(_manifest(video_id))
+
+    assert cache.get("aaaaaaaaaaa") is None
+    assert cache.get("ccccccccccc") is not None
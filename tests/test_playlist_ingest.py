@@ -0,0 +1,145 @@
+import pytest
+
+from playlist_ingest import IngestCheckpoint, IngestCursor, PlaylistIngestor
+
+
+class _Request:
+    def __init__(self, response):
+        self._response = response
+
+    def execute(self):
+        return self._response
+
+
+class _Resource:
+    def __init__(self, list_method):
+        self.list = list_method
+
+
+class FakeYouTube:
+    """Serves a playlist from memory through the Data API call shapes used by the ingestor."""
+
+    def __init__(self, video_ids, page_size=3, unavailable=()):
+        self.video_ids = list(video_ids)
+        self.page_size = page_size
+        self.unavailable = set(unavailable)
+        self.page_tokens = []
+
+    def playlistItems(self):
+        return _Resource(self._list_items)
+
+    def videos(self):
+        return _Resource(self._list_videos)
+
+    def _list_items(self, part, playlistId, maxResults, pageToken=None):
+        self.page_tokens.append(pageToken)
+        start = int(pageToken or 0)
+        end = start + self.page_size
+        response = {
+            "items": [{"contentDetails": {"videoId": v}} for v in self.video_ids[start:end]],
+            "pageInfo": {"totalResults": len(self.video_ids)},
+        }
+        if end < len(self.video_ids):
+            response["nextPageToken"] = str(end)
+        return _Request(response)
+
+    def _list_videos(self, part, id, maxResults):
+        return _Request({"items": [
+            {
+                "id": v,
+                "snippet": {"title": f"Video {v}", "channelTitle": "Channel"},
+                "contentDetails": {"duration": "PT1M"},
+            }
+            for v in id.split(",") if v not in self.unavailable
+        ]})
+
+
+class _Crash(Exception):
+    pass
+
+
+def _ids(count):
+    return [f"v{i:02d}" for i in range(count)]
+
+
+def _ingestor(api, download, checkpoint, progress):
+    return PlaylistIngestor(
+        api,
+        download,
+        workers=1,
+        checkpoint=checkpoint,
+        on_progress=lambda handled, total: progress.append((handled, total)),
+    )
+
+
+def test_ingests_every_video_and_clears_checkpoint(tmp_path):
+    api = FakeYouTube(_ids(7))
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoints.json"))
+    downloaded, progress = [], []
+
+    handled = _ingestor(api, lambda v: downloaded.append(v["id"]), checkpoint, progress).run("PL1", "/music")
+
+    assert handled == 7
+    assert sorted(downloaded) == _ids(7)
+    assert progress[-1] == (7, 7)
+    assert checkpoint.load("PL1", "/music") == IngestCursor(None, 0)
+
+
+def test_resumes_after_crash_with_full_progress(tmp_path):
+    api = FakeYouTube(_ids(8))
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoints.json"))
+    downloaded = []
+
+    # Listing the third page fails; the videos already queued still finish
+    list_items = api._list_items
+
+    def failing_list_items(part, playlistId, maxResults, pageToken=None):
+        if pageToken == "6":
+            raise _Crash()
+        return list_items(part, playlistId, maxResults, pageToken)
+
+    api._list_items = failing_list_items
+    with pytest.raises(_Crash):
+        _ingestor(api, lambda v: downloaded.append(v["id"]), checkpoint, []).run("PL1", "/music")
+    assert checkpoint.load("PL1", "/music") == IngestCursor("6", 6)
+
+    api._list_items = list_items
+    api.page_tokens.clear()
+    progress = []
+    handled = _ingestor(api, lambda v: downloaded.append(v["id"]), checkpoint, progress).run("PL1", "/music")
+
+    # Listing restarts at the first unfinished page, and progress reaches 100%
+    assert api.page_tokens == ["6"]
+    assert handled == 2
+    assert sorted(downloaded) == _ids(8)
+    assert progress == [(7, 8), (8, 8)]
+    assert checkpoint.load("PL1", "/music") == IngestCursor(None, 0)
+
+
+def test_checkpoints_are_kept_per_destination(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path / "checkpoints.json"))
+    checkpoint.save("PL1", "/music", IngestCursor("3", 3))
+
+    assert checkpoint.load("PL1", "/music") == IngestCursor("3", 3)
+    assert checkpoint.load("PL1", "/videos") == IngestCursor(None, 0)
+    assert checkpoint.load("PL2", "/music") == IngestCursor(None, 0)
+
+    # A new destination lists the playlist from the start
+    api = FakeYouTube(_ids(5))
+    _ingestor(api, lambda v: None, checkpoint, []).run("PL1", "/videos")
+    assert api.page_tokens[0] is None
+    assert checkpoint.load("PL1", "/music") == IngestCursor("3", 3)
+
+    checkpoint.clear("PL1", "/music")
+    assert checkpoint.load("PL1", "/music") == IngestCursor(None, 0)
+
+
+def test_unavailable_videos_count_towards_progress(tmp_path):
+    api = FakeYouTube(_ids(6), unavailable={"v01", "v03", "v04", "v05"})
+    downloaded, progress = [], []
+
+    handled = _ingestor(api, lambda v: downloaded.append(v["id"]), None, progress).run("PL1")
+
+    assert sorted(downloaded) == ["v00", "v02"]
+    assert handled == 2
+    assert progress[-1] == (6, 6)
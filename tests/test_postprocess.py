@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+
+import pytest
+
+import postprocess
+from postprocess import PostProcessor
+
+
+def _rename(path, suffix=".done"):
+    return path + suffix
+
+
+def _crash(path):
+    os._exit(1)
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    # Workers only see test stages registered here if they are forked
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("needs the fork start method")
+    monkeypatch.setitem(postprocess.STAGES, "rename", _rename)
+    monkeypatch.setitem(postprocess.STAGES, "crash", _crash)
+
+
+def test_runs_stages_in_order(stages):
+    processor = PostProcessor(max_workers=1)
+    try:
+        result = processor.submit("a.mp4", [("rename", {}), ("rename", {"suffix": ".x"})]).result(30)
+    finally:
+        processor.shutdown()
+
+    assert result.output == "a.mp4.done.x"
+    assert [name for name, _ in result.timings] == ["rename", "rename"]
+
+
+def test_recovers_after_a_worker_dies(stages):
+    processor = PostProcessor(max_workers=1)
+    try:
+        crashed = processor.submit("a.mp4", [("crash", {})])
+        with pytest.raises(Exception):
+            crashed.result(30)
+
+        # The pool is broken now; later jobs must still run instead of hanging
+        results = [processor.submit(f"{i}.mp4", [("rename", {})]) for i in range(3)]
+        assert [f.result(30).output for f in results] == [f"{i}.mp4.done" for i in range(3)]
+        assert processor.running == 0
+    finally:
+        processor.shutdown()
+
+
+def test_rejects_unknown_stages():
+    processor = PostProcessor(max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            processor.submit("a.mp4", [("nope", {})])
+    finally:
+        processor.shutdown()
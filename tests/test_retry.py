@@ -0,0 +1,136 @@
+import http.client
+import socket
+from urllib.error import HTTPError, URLError
+
+import pytest
+
+import retry
+from retry import RetryPolicy, is_retryable
+
+
+def _http_error(code):
+    return HTTPError("https://www.youtube.com/watch?v=x", code, "status", {}, None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retry.time, "sleep", calls.append)
+    return calls
+
+
+def _failing(*errors, result="done"):
+    """Callable raising errors in order, then returning result."""
+    remaining = list(errors)
+    calls = []
+
+    def func(*args, **kwargs):
+        calls.append((args, kwargs))
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    func.calls = calls
+    return func
+
+
+@pytest.mark.parametrize("code", [408, 425, 429, 500, 502, 503, 504])
+def test_rate_limits_and_server_errors_are_retryable(code):
+    assert is_retryable(_http_error(code))
+
+
+@pytest.mark.parametrize("code", [400, 401, 403, 404, 410])
+def test_client_errors_are_fatal(code):
+    assert not is_retryable(_http_error(code))
+
+
+@pytest.mark.parametrize("error", [
+    URLError("temporary failure in name resolution"),
+    URLError(socket.timeout("timed out")),
+    socket.timeout("timed out"),
+    TimeoutError("timed out"),
+    ConnectionResetError("reset by peer"),
+    http.client.IncompleteRead(b"partial", 100),
+    http.client.RemoteDisconnected("closed"),
+])
+def test_network_failures_are_retryable(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [ValueError("bad json"), KeyError("streamingData")])
+def test_other_errors_are_fatal(error):
+    assert not is_retryable(error)
+
+
+def test_retries_until_success(sleeps):
+    func = _failing(_http_error(503), socket.timeout("timed out"))
+
+    assert RetryPolicy(max_attempts=3).call(func, "url", timeout=5) == "done"
+    assert func.calls == [(("url",), {"timeout": 5})] * 3
+    assert len(sleeps) == 2
+
+
+def test_fatal_error_is_raised_without_retrying(sleeps):
+    error = _http_error(404)
+    func = _failing(error)
+
+    with pytest.raises(HTTPError) as raised:
+        RetryPolicy().call(func)
+
+    assert raised.value is error
+    assert len(func.calls) == 1
+    assert sleeps == []
+
+
+def test_last_error_is_raised_when_attempts_run_out(sleeps):
+    errors = [_http_error(429), _http_error(500), _http_error(503)]
+    func = _failing(*errors)
+
+    with pytest.raises(HTTPError) as raised:
+        RetryPolicy(max_attempts=3).call(func)
+
+    assert raised.value is errors[-1]
+    assert len(func.calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_single_attempt_never_retries(sleeps):
+    func = _failing(socket.timeout("timed out"))
+
+    with pytest.raises(socket.timeout):
+        RetryPolicy(max_attempts=1).call(func)
+
+    assert len(func.calls) == 1
+    assert sleeps == []
+
+
+def test_on_retry_gets_attempt_error_and_delay(sleeps, monkeypatch):
+    # Full jitter at its upper bound, so the delays are deterministic
+    monkeypatch.setattr(retry.random, "uniform", lambda low, high: high)
+    errors = [URLError("refused"), _http_error(502), socket.timeout("timed out")]
+    func = _failing(*errors)
+    retries = []
+
+    policy = RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=1.5)
+    assert policy.call(func, on_retry=lambda *args: retries.append(args)) == "done"
+
+    assert retries == [(1, errors[0], 0.5), (2, errors[1], 1.0), (3, errors[2], 1.5)]
+    assert sleeps == [0.5, 1.0, 1.5]
+
+
+def test_delays_are_jittered_below_the_cap():
+    policy = RetryPolicy(max_attempts=6, base_delay=0.5, max_delay=2.0)
+
+    for _ in range(100):
+        delays = list(policy.delays())
+        assert len(delays) == 5
+        for n, delay in enumerate(delays):
+            assert 0 <= delay <= min(2.0, 0.5 * 2 ** n)
+
+
+def test_custom_retryable_predicate(sleeps):
+    func = _failing(ValueError("stale signature"))
+
+    policy = RetryPolicy(retryable=lambda e: isinstance(e, ValueError))
+    assert policy.call(func) == "done"
+    assert len(sleeps) == 1
@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import stream_encode
+from stream_encode import PIECE_SIZE, StreamingEncoder
+
+# Stands in for ffmpeg: waits for a go-ahead file if asked, then copies stdin to the output
+_FAKE_FFMPEG = f"""#!{sys.executable}
+import os, shutil, sys, time
+gate = os.environ.get("FAKE_FFMPEG_GATE")
+while gate and not os.path.exists(gate):
+    time.sleep(0.01)
+with open(sys.argv[-1], "wb") as out:
+    shutil.copyfileobj(sys.stdin.buffer, out)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    if os.name != "posix":
+        pytest.skip("needs an executable script")
+    path = tmp_path / "ffmpeg"
+    path.write_text(_FAKE_FFMPEG)
+    path.chmod(0o755)
+    monkeypatch.setattr(stream_encode, "FFMPEG", str(path))
+    return path
+
+
+def test_encodes_through_temporary_file(tmp_path, fake_ffmpeg):
+    output = tmp_path / "out" / "song.mp3"
+    data = os.urandom(300_000)
+
+    with StreamingEncoder(str(output), "mp3", tee_path=str(tmp_path / "out" / "song.webm")) as encoder:
+        encoder.write(data[:100_000])
+        encoder.write(data[100_000:])
+
+    assert output.read_bytes() == data
+    assert (tmp_path / "out" / "song.webm").read_bytes() == data
+    assert sorted(os.listdir(tmp_path / "out")) == ["song.mp3", "song.webm"]
+
+
+def test_buffer_is_bounded_in_bytes(tmp_path, fake_ffmpeg, monkeypatch):
+    gate = tmp_path / "go"
+    monkeypatch.setenv("FAKE_FFMPEG_GATE", str(gate))
+    output = tmp_path / "song.mp3"
+    data = os.urandom(8 * 1024 * 1024)
+    encoder = StreamingEncoder(str(output), "mp3", buffer_bytes=4 * PIECE_SIZE)
+
+    # One large chunk, like a whole pytube range, while ffmpeg is not reading
+    writer = threading.Thread(target=encoder.write, args=(data,))
+    writer.start()
+    time.sleep(0.5)
+    queued = sum(len(piece) for piece in list(encoder._buffer.queue) if piece)
+
+    assert writer.is_alive()
+    assert queued <= 4 * PIECE_SIZE
+
+    gate.touch()
+    writer.join(10)
+    encoder.close()
+    assert output.read_bytes() == data
+
+
+def test_missing_ffmpeg_leaves_no_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(stream_encode, "FFMPEG", str(tmp_path / "no-such-ffmpeg"))
+
+    with pytest.raises(FileNotFoundError):
+        StreamingEncoder(str(tmp_path / "Song [abc.140].mp3"), "mp3")
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_tee_stops_ffmpeg_and_cleans_up(tmp_path, fake_ffmpeg, monkeypatch):
+    started = []
+    popen = stream_encode.subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        started.append(popen(*args, **kwargs))
+        return started[-1]
+
+    class FullDisk(OSError):
+        pass
+
+    def failing_tee(*args, **kwargs):
+        raise FullDisk("No space left on device")
+
+    monkeypatch.setattr(stream_encode.subprocess, "Popen", recording_popen)
+    monkeypatch.setattr(stream_encode, "AtomicWriter", failing_tee)
+
+    with pytest.raises(FullDisk):
+        StreamingEncoder(str(tmp_path / "song.mp3"), "mp3", tee_path=str(tmp_path / "song.webm"))
+
+    assert started[0].poll() is not None
+    assert os.listdir(tmp_path) == ["ffmpeg"]
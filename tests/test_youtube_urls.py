@@ -0,0 +1,144 @@
+import io
+
+import pytest
+
+import youtube_urls
+from youtube_urls import (
+    PLAYLIST, VIDEO, CanonicalizeStats, CanonicalRef, canonical_channel_id, canonicalize,
+    iter_canonical, iter_lines
+)
+
+VIDEO_ID = "dQw4w9WgXcQ"
+PLAYLIST_ID = "PLx0sYbCqOb8TBPRdmBHs5Iftvv9TPboYG"
+CHANNEL_ID = "UC38IQsAvIsxxjztdMZQtwHA"
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}",
+    f"http://youtube.com/watch?v={VIDEO_ID}",
+    f"www.youtube.com/watch?v={VIDEO_ID}",
+    f"youtube.com/watch?v={VIDEO_ID}",
+    f"HTTPS://WWW.YOUTUBE.COM/watch?v={VIDEO_ID}",
+    f"  https://www.youtube.com/watch?v={VIDEO_ID}  \n",
+    f"https://m.youtube.com/watch?v={VIDEO_ID}",
+    f"https://music.youtube.com/watch?v={VIDEO_ID}&feature=share",
+    f"https://www.youtube.com/watch/?v={VIDEO_ID}",
+    f"https://www.youtube.com/watch?feature=youtu.be&v={VIDEO_ID}&t=42s",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}#t=42",
+    f"https://youtu.be/{VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}/",
+    f"https://youtu.be/{VIDEO_ID}?si=abc&t=10",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}?feature=share",
+    f"https://www.youtube.com/embed/{VIDEO_ID}?autoplay=1",
+    f"https://www.youtube-nocookie.com/embed/{VIDEO_ID}",
+    f"https://www.youtube.com/v/{VIDEO_ID}",
+    f"https://www.youtube.com/e/{VIDEO_ID}",
+    f"https://www.youtube.com/live/{VIDEO_ID}?si=abc",
+])
+def test_video_url_forms(url):
+    assert canonicalize(url) == CanonicalRef(VIDEO, VIDEO_ID)
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/playlist?list={PLAYLIST_ID}",
+    f"youtube.com/playlist?list={PLAYLIST_ID}&si=abc",
+    f"https://music.youtube.com/playlist?list={PLAYLIST_ID}",
+    f"https://www.youtube.com/embed/videoseries?list={PLAYLIST_ID}",
+])
+def test_playlist_only_urls(url):
+    assert canonicalize(url) == CanonicalRef(PLAYLIST, PLAYLIST_ID)
+
+
+@pytest.mark.parametrize("url", [
+    f"https://www.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}&index=3",
+    f"https://www.youtube.com/watch?list={PLAYLIST_ID}&v={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}?list={PLAYLIST_ID}",
+])
+def test_video_wins_over_playlist(url):
+    assert canonicalize(url) == CanonicalRef(VIDEO, VIDEO_ID)
+
+
+@pytest.mark.parametrize("url", [
+    "",
+    "   ",
+    "not a url",
+    f"https://vimeo.com/watch?v={VIDEO_ID}",
+    f"https://notyoutube.com/watch?v={VIDEO_ID}",
+    f"https://youtube.com.example.com/watch?v={VIDEO_ID}",
+    f"https://www.youtube.com/watch?v={VIDEO_ID[:10]}",
+    f"https://www.youtube.com/watch?v={VIDEO_ID}X",
+    f"https://www.youtube.com/watch?v={VIDEO_ID[:10]}!",
+    f"https://www.youtube.com/watch?vv={VIDEO_ID}",
+    f"https://youtu.be/{VIDEO_ID}/extra",
+    f"https://youtu.be/watch?v={VIDEO_ID}",
+    f"https://www.youtube.com/{VIDEO_ID}",
+    f"https://www.youtube.com/shorts/{VIDEO_ID}/extra",
+    "https://www.youtube.com/playlist?list=short",
+    f"https://www.youtube.com/channel/{CHANNEL_ID}",
+    "https://www.youtube.com/@somehandle",
+])
+def test_invalid_urls(url):
+    assert canonicalize(url) is None
+
+
+def test_channel_ids():
+    assert canonical_channel_id(f"https://www.youtube.com/channel/{CHANNEL_ID}") == CHANNEL_ID
+    assert canonical_channel_id(f"youtube.com/channel/{CHANNEL_ID}/") == CHANNEL_ID
+    assert canonical_channel_id(f"https://www.youtube.com/channel/{CHANNEL_ID}/videos") is None
+    assert canonical_channel_id(f"https://youtu.be/channel/{CHANNEL_ID}") is None
+    assert canonical_channel_id(f"https://www.youtube.com/channel/{CHANNEL_ID[:-1]}") is None
+    assert canonical_channel_id(f"https://www.youtube.com/watch?v={VIDEO_ID}") is None
+
+
+def test_canonical_urls():
+    assert CanonicalRef(VIDEO, VIDEO_ID).url == f"https://www.youtube.com/watch?v={VIDEO_ID}"
+    assert CanonicalRef(PLAYLIST, PLAYLIST_ID).url == f"https://www.youtube.com/playlist?list={PLAYLIST_ID}"
+
+
+def test_iter_canonical_dedupes_across_url_forms():
+    lines = [
+        "# exported from bookmarks\n",
+        f"https://www.youtube.com/watch?v={VIDEO_ID}\n",
+        "\n",
+        f"https://youtu.be/{VIDEO_ID}?t=1\n",
+        f"https://www.youtube.com/shorts/{VIDEO_ID}\n",
+        f"https://www.youtube.com/playlist?list={PLAYLIST_ID}\n",
+        f"https://www.youtube.com/watch?v={VIDEO_ID}&list={PLAYLIST_ID}\n",
+        "https://example.com/video\n",
+        f"https://www.youtube.com/playlist?list={PLAYLIST_ID}&si=x\n",
+    ]
+    stats = CanonicalizeStats()
+
+    refs = list(iter_canonical(lines, stats))
+
+    assert refs == [CanonicalRef(VIDEO, VIDEO_ID), CanonicalRef(PLAYLIST, PLAYLIST_ID)]
+    assert (stats.lines, stats.unique, stats.duplicates, stats.invalid) == (9, 2, 4, 1)
+
+
+def test_iter_canonical_is_lazy():
+    def lines():
+        yield f"https://youtu.be/{VIDEO_ID}"
+        raise AssertionError("read past the first line")
+
+    assert next(iter_canonical(lines())) == CanonicalRef(VIDEO, VIDEO_ID)
+
+
+def test_iter_lines_reads_files_and_stdin(tmp_path):
+    path = tmp_path / "urls.txt"
+    path.write_text("a\nb\n", encoding="utf-8")
+    stdin = io.StringIO("c\n")
+
+    assert list(iter_lines([str(path), "-"], stdin=stdin)) == ["a\n", "b\n", "c\n"]
+    assert list(iter_lines([], stdin=io.StringIO("d\n"))) == ["d\n"]
+
+
+def test_main_prints_canonical_urls_and_stats(tmp_path, capsys):
+    path = tmp_path / "urls.txt"
+    path.write_text(
+        f"https://youtu.be/{VIDEO_ID}\nyoutube.com/watch?v={VIDEO_ID}\nnope\n", encoding="utf-8")
+
+    youtube_urls.main([str(path), "--ids"])
+
+    out, err = capsys.readouterr()
+    assert out == f"video\t{VIDEO_ID}\n"
+    assert err.strip() == "3 lines, 1 unique, 1 duplicates, 1 invalid"
@@ -0,0 +1,195 @@
+"""
+Lightweight phase tracing exported as Chrome trace-event JSON.
+
+Set DOWNLOADER_TRACE to a file path to enable tracing; the trace is
+written there at exit (open it in chrome://tracing or Perfetto) and a
+per-phase percentile summary is printed to stderr. When disabled,
+``tracer.span()`` returns a shared no-op object, so instrumentation can
+stay in place at negligible cost.
+"""
+import os
+import sys
+import json
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+# Environment variable naming the trace file; tracing is off when unset
+TRACE_ENV = "DOWNLOADER_TRACE"
+
+# Most recent spans kept in memory
+MAX_EVENTS = 100_000
+
+
+class _NullSpan:
+    """Span returned while tracing is disabled; every method is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed phase; use as a context manager and attach data with set()."""
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.record(self.name, self.start, time.perf_counter_ns() - self.start, **self.args)
+        return False
+
+    def set(self, **args):
+        """Attach data (bytes, retries, ...) to the span."""
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects spans from any thread and exports them."""
+
+    def __init__(self, enabled: bool = False, max_events: int = MAX_EVENTS):
+        """
+        Initialize the tracer.
+
+        Args:
+            enabled: Record spans (when False, span() returns a no-op)
+            max_events: Most recent spans kept in memory
+        """
+        self.enabled = enabled
+        self._events: deque = deque(maxlen=max_events)
+        self._threads: Dict[int, str] = {}
+
+    def span(self, name: str, **args):
+        """
+        Time a phase.
+
+        Args:
+            name: Phase name, e.g. "oauth" or "transfer"
+            **args: Data attached to the span
+
+        Returns:
+            A context manager whose set() attaches more data
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name: str, start_ns: int, duration_ns: int, pid: Optional[int] = None, **args):
+        """
+        Record a finished span measured elsewhere (e.g. in a worker process).
+
+        Args:
+            name: Phase name
+            start_ns: Start time from time.perf_counter_ns()
+            duration_ns: Duration in nanoseconds
+            pid: Process the work ran in (defaults to this one)
+            **args: Data attached to the span
+        """
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        if thread.ident not in self._threads:
+            self._threads[thread.ident] = thread.name
+        self._events.append((name, start_ns, duration_ns, pid or os.getpid(), thread.ident, args))
+
+    def clear(self):
+        """Drop every recorded span."""
+        self._events.clear()
+
+    def events(self) -> List[Dict]:
+        """
+        Recorded spans as Chrome trace events.
+
+        Returns:
+            List of complete ("X") events plus thread-name metadata events
+        """
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        for name, start_ns, duration_ns, span_pid, tid, args in list(self._events):
+            events.append({
+                "name": name,
+                "cat": "downloader",
+                "ph": "X",
+                "ts": start_ns / 1000,
+                "dur": duration_ns / 1000,
+                "pid": span_pid,
+                "tid": tid if span_pid == pid else span_pid,
+                "args": args,
+            })
+        return events
+
+    def export_chrome_trace(self, path: str):
+        """Write the recorded spans as a Chrome trace-event JSON file."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f, default=str)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-phase duration statistics.
+
+        Returns:
+            Mapping of phase name to count, p50, p90, p99 and max in milliseconds
+        """
+        durations: Dict[str, List[float]] = {}
+        for name, _, duration_ns, _, _, _ in list(self._events):
+            durations.setdefault(name, []).append(duration_ns / 1e6)
+
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]  # noqa: E731
+            result[name] = {
+                "count": len(values),
+                "p50": pick(0.50),
+                "p90": pick(0.90),
+                "p99": pick(0.99),
+                "max": values[-1],
+            }
+        return result
+
+    def format_summary(self) -> str:
+        """The summary as a text table."""
+        lines = [f"{'phase':24} {'count':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'max ms':>10}"]
+        for name, s in sorted(self.summary().items()):
+            lines.append(
+                f"{name:24} {s['count']:>6} {s['p50']:>10.1f} {s['p90']:>10.1f} {s['p99']:>10.1f} {s['max']:>10.1f}"
+            )
+        return "\n".join(lines)
+
+
+def _export_at_exit(path: str):
+    tracer.export_chrome_trace(path)
+    print(tracer.format_summary(), file=sys.stderr)
+
+
+# Process-wide tracer used by the instrumentation
+tracer = Tracer(enabled=bool(os.environ.get(TRACE_ENV)))
+
+if tracer.enabled:
+    atexit.register(_export_at_exit, os.environ[TRACE_ENV])
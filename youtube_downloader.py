@@ -1,6 +1,5 @@
 import sys
 import os
-import re
 import json
 import time
 from PyQt5.QtWidgets import (
@@ -23,12 +22,42 @@ import pickle
 # For downloading
 import yt_dlp
 
+from atomic_write import DEFAULT_BUFFER_SIZE, YTDLP_FILENAME, sync_file
+from bandwidth import bandwidth_manager
+from download_backends import get_backend
+from download_store import DownloadStore
+from format_records import format_human_size, formats_from_info
+from http_pool import install_pytube
+from playlist_ingest import IngestCheckpoint, PlaylistIngestor, uploads_playlist_id
+from postprocess import PostProcessor
+from tracing import tracer
+from youtube_urls import canonical_channel_id, canonical_playlist_id, canonical_video_id
+
 # YouTube API constants
 SCOPES = ["https://www.googleapis.com/auth/youtube.readonly"]
 API_SERVICE_NAME = "youtube"
 API_VERSION = "v3"
 CLIENT_SECRETS_FILE = "client_secrets.json"
 
+# Post-processing choices offered after download: (label, stages)
+POSTPROCESS_OPTIONS = [
+    ("Keep original", []),
+    ("Extract audio (mp3)", [("extract_audio", {"codec": "mp3"})]),
+    ("Extract audio (opus)", [("extract_audio", {"codec": "opus"})]),
+    ("Transcode to mp4 (H.264/AAC)", [("transcode", {"container": "mp4"})]),
+]
+
+# Format used for every video of a playlist or channel
+PLAYLIST_FORMAT = "best"
+
+# Backend that downloads playlist and channel entries (see download_backends.BACKENDS)
+PLAYLIST_BACKEND = os.environ.get("DOWNLOAD_BACKEND", "yt-dlp")
+
+# The pytube backend shares keep-alive connections (this patches pytube process-wide)
+if PLAYLIST_BACKEND == "pytube":
+    install_pytube()
+
+
 class AuthManager:
     """Manages authentication with YouTube API"""
     
@@ -38,33 +67,34 @@ class AuthManager:
         
     def get_authenticated_service(self):
         """Authenticates with YouTube API and returns the service"""
-        # Load saved credentials if they exist
-        if os.path.exists("token.pickle"):
-            with open("token.pickle", "rb") as token:
-                self.credentials = pickle.load(token)
+        with tracer.span("oauth"):
+            # Load saved credentials if they exist
+            if os.path.exists("token.pickle"):
+                with open("token.pickle", "rb") as token:
+                    self.credentials = pickle.load(token)
                 
-        # If credentials don't exist or are invalid, get new ones
-        if not self.credentials or not self.credentials.valid:
-            if self.credentials and self.credentials.expired and self.credentials.refresh_token:
-                self.credentials.refresh(Request())
-            else:
-                # Check if client secrets file exists
-                if not os.path.exists(CLIENT_SECRETS_FILE):
-                    return None, "Client secrets file not found. Please set up OAuth 2.0 credentials."
+            # If credentials don't exist or are invalid, get new ones
+            if not self.credentials or not self.credentials.valid:
+                if self.credentials and self.credentials.expired and self.credentials.refresh_token:
+                    self.credentials.refresh(Request())
+                else:
+                    # Check if client secrets file exists
+                    if not os.path.exists(CLIENT_SECRETS_FILE):
+                        return None, "Client secrets file not found. Please set up OAuth 2.0 credentials."
                 
-                flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
-                    CLIENT_SECRETS_FILE, SCOPES)
-                self.credentials = flow.run_local_server(port=0)
+                    flow = google_auth_oauthlib.flow.InstalledAppFlow.from_client_secrets_file(
+                        CLIENT_SECRETS_FILE, SCOPES)
+                    self.credentials = flow.run_local_server(port=0)
                 
-            # Save the credentials for future use
-            with open("token.pickle", "wb") as token:
-                pickle.dump(self.credentials, token)
+                # Save the credentials for future use
+                with open("token.pickle", "wb") as token:
+                    pickle.dump(self.credentials, token)
                 
-        # Build the YouTube API service
-        self.youtube = googleapiclient.discovery.build(
-            API_SERVICE_NAME, API_VERSION, credentials=self.credentials)
+            # Build the YouTube API service
+            self.youtube = googleapiclient.discovery.build(
+                API_SERVICE_NAME, API_VERSION, credentials=self.credentials)
             
-        return self.youtube, None
+            return self.youtube, None
 
 
 class VideoDownloadThread(QThread):
@@ -72,12 +102,22 @@ class VideoDownloadThread(QThread):
     progress_signal = pyqtSignal(int, str)
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
+    postprocess_signal = pyqtSignal(str)
 
-    def __init__(self, url, format_id, save_path):
+    def __init__(self, url, format_id, save_path, video_id=None, store=None, weight=1.0,
+                 postprocessor=None, stages=None):
         super().__init__()
         self.url = url
         self.format_id = format_id
         self.save_path = save_path
+        self.video_id = video_id
+        self.store = store
+        self.weight = weight
+        self.postprocessor = postprocessor
+        self.stages = stages or []
+        self.bandwidth_job = None
+        self.last_downloaded = 0
+        self.transferred_bytes = 0
         
     def progress_hook(self, d):
         """Process progress updates from yt-dlp"""
@@ -86,6 +126,18 @@ class VideoDownloadThread(QThread):
             downloaded = d.get('downloaded_bytes', 0)
             total = d.get('total_bytes', 0) or d.get('total_bytes_estimate', 0)
             
+            # Draw the new bytes from the shared bandwidth budget; blocking
+            # here throttles yt-dlp's read loop
+            if downloaded < self.last_downloaded:
+                self.last_downloaded = 0  # Next file of a multi-part download
+            new_bytes = downloaded - self.last_downloaded
+            self.last_downloaded = downloaded
+            self.transferred_bytes += new_bytes
+            if self.bandwidth_job is None:
+                # Registered at the first bytes, so resolving the video holds no share
+                self.bandwidth_job = bandwidth_manager.register(self.url, self.weight)
+            self.bandwidth_job.consume(new_bytes)
+            
             if total > 0:
                 percentage = int(downloaded / total * 100)
                 self.progress_signal.emit(
@@ -97,29 +149,123 @@ class VideoDownloadThread(QThread):
             
     def format_human_size(self, size):
         """Formats byte size to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024 or unit == 'GB':
-                return f"{size:.1f} {unit}"
-            size /= 1024
+        return format_human_size(size)
+        
+    def download(self):
+        """Download the selected format with yt-dlp and return the file path"""
+        # yt-dlp options
+        ydl_opts = {
+            'format': self.format_id,
+            'outtmpl': os.path.join(self.save_path, YTDLP_FILENAME),
+            'buffersize': DEFAULT_BUFFER_SIZE,
+            'progress_hooks': [self.progress_hook],
+            'quiet': True,
+            'no_warnings': True,
+        }
+        
+        # Start download
+        self.last_downloaded = 0
+        self.transferred_bytes = 0
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                # Resolve and download separately so each phase is traced on its own
+                with tracer.span("extract_info", url=self.url):
+                    info = ydl.extract_info(self.url, download=False)
+                with tracer.span("transfer", format_id=self.format_id) as span:
+                    info = ydl.process_ie_result(info, download=True)
+                    span.set(bytes=self.transferred_bytes)
+                filename = ydl.prepare_filename(info)
+            sync_file(filename)
+            return filename
+        finally:
+            if self.bandwidth_job:
+                self.bandwidth_job.close()
+                self.bandwidth_job = None
         
     def run(self):
         """Main download function"""
         try:
-            # yt-dlp options
-            ydl_opts = {
-                'format': self.format_id,
-                'outtmpl': os.path.join(self.save_path, '%(title)s.%(ext)s'),
-                'progress_hooks': [self.progress_hook],
-                'quiet': True,
-                'no_warnings': True,
-            }
-            
-            # Start download
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(self.url, download=True)
-                filename = ydl.prepare_filename(info)
+            # Reuse a completed download of the same video and format if we have one
+            if self.store and self.video_id:
+                filename, downloaded = self.store.fetch(
+                    self.video_id, self.format_id, self.save_path, self.download)
+            else:
+                filename, downloaded = self.download(), True
+                
+            # Hand the file to the post-processing pool; this only blocks when
+            # the pool's queue is full, so the next download can start
+            if self.postprocessor and self.stages:
+                future = self.postprocessor.submit(filename, self.stages)
+                future.add_done_callback(self.postprocess_done)
                 
-            self.finished_signal.emit(f"Download complete: {os.path.basename(filename)}")
+            if downloaded:
+                self.finished_signal.emit(f"Download complete: {os.path.basename(filename)}")
+            else:
+                self.finished_signal.emit(f"Already downloaded: {os.path.basename(filename)}")
+            
+        except Exception as e:
+            self.error_signal.emit(f"Error: {str(e)}")
+            
+    def postprocess_done(self, future):
+        """Report the outcome of post-processing (called from the pool's thread)"""
+        error = future.exception()
+        if error:
+            self.postprocess_signal.emit(f"Post-processing failed: {error}")
+        else:
+            result = future.result()
+            timings = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in result.timings)
+            self.postprocess_signal.emit(
+                f"Post-processed: {os.path.basename(result.output)} ({timings})")
+
+
+class PlaylistIngestThread(QThread):
+    """Thread for downloading every video of a playlist or channel"""
+    progress_signal = pyqtSignal(int, str)
+    finished_signal = pyqtSignal(str)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, youtube, playlist_id, save_path, store=None, workers=2, backend=PLAYLIST_BACKEND):
+        super().__init__()
+        self.youtube = youtube
+        self.playlist_id = playlist_id
+        self.save_path = save_path
+        self.store = store
+        self.workers = workers
+        self.backend = get_backend(backend)
+        self.failures = 0
+        
+    def download_video(self, video):
+        """Download one playlist entry (called on an ingestion worker thread)"""
+        def download():
+            return self.backend.download(video['url'], PLAYLIST_FORMAT, self.save_path)
+        if self.store:
+            self.store.fetch(video['id'], PLAYLIST_FORMAT, self.save_path, download)
+        else:
+            download()
+            
+    def on_progress(self, handled, total):
+        """Report how many playlist entries have been handled"""
+        percentage = int(handled / total * 100) if total else 0
+        self.progress_signal.emit(min(percentage, 100), f"Playlist: {handled} of {total} videos handled")
+        
+    def on_error(self, video, error):
+        """Count failed entries; ingestion carries on with the rest"""
+        self.failures += 1
+        
+    def run(self):
+        """List the playlist page by page while downloading its videos"""
+        try:
+            ingestor = PlaylistIngestor(
+                self.youtube,
+                self.download_video,
+                workers=self.workers,
+                checkpoint=IngestCheckpoint(),
+                on_progress=self.on_progress,
+                on_error=self.on_error,
+            )
+            handled = ingestor.run(self.playlist_id, self.save_path)
+            self.finished_signal.emit(
+                f"Playlist complete: {handled} videos handled, {self.failures} failed")
             
         except Exception as e:
             self.error_signal.emit(f"Error: {str(e)}")
@@ -134,6 +280,8 @@ class YouTubeDataAPIDownloader(QWidget):
         self.setMinimumHeight(500)
         
         self.auth_manager = AuthManager()
+        self.download_store = DownloadStore()
+        self.postprocessor = PostProcessor(max_workers=max(1, (os.cpu_count() or 2) // 2))
         self.youtube = None
         self.video_info = None
         self.video_formats = []
@@ -181,6 +329,16 @@ class YouTubeDataAPIDownloader(QWidget):
         format_layout.addWidget(format_label)
         format_layout.addWidget(self.format_combo)
         
+        # Post-processing selection section
+        postprocess_layout = QHBoxLayout()
+        postprocess_label = QLabel("After Download:")
+        self.postprocess_combo = QComboBox()
+        for label, _ in POSTPROCESS_OPTIONS:
+            self.postprocess_combo.addItem(label)
+            
+        postprocess_layout.addWidget(postprocess_label)
+        postprocess_layout.addWidget(self.postprocess_combo)
+        
         # Download section
         download_layout = QHBoxLayout()
         self.download_btn = QPushButton("Download")
@@ -207,6 +365,7 @@ class YouTubeDataAPIDownloader(QWidget):
         main_layout.addSpacing(10)
         main_layout.addLayout(info_layout)
         main_layout.addLayout(format_layout)
+        main_layout.addLayout(postprocess_layout)
         main_layout.addLayout(download_layout)
         main_layout.addLayout(progress_layout)
         
@@ -223,20 +382,22 @@ class YouTubeDataAPIDownloader(QWidget):
                 "See: https://developers.google.com/youtube/v3/quickstart/python"
             )
     
+    def authenticate(self):
+        """Authenticate with YouTube API if needed, returns True on success"""
+        self.status_label.setText("Authenticating with YouTube API...")
+        QApplication.processEvents()
+        
+        if not self.youtube:
+            self.youtube, error = self.auth_manager.get_authenticated_service()
+            if error:
+                QMessageBox.critical(self, "Authentication Error", error)
+                return False
+                
+        return True
+    
     def extract_video_id(self, url):
         """Extract YouTube video ID from URL"""
-        patterns = [
-            r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',  # Standard and shared URLs
-            r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})',  # Short URLs
-            r'(?:embed\/)([0-9A-Za-z_-]{11})',  # Embed URLs
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-                
-        return None
+        return canonical_video_id(url)
         
     def analyze_video(self):
         """Fetch and display video information from YouTube Data API"""
@@ -246,19 +407,21 @@ class YouTubeDataAPIDownloader(QWidget):
             return
             
         video_id = self.extract_video_id(url)
+        
+        # Playlist and channel URLs are downloaded as a whole
+        playlist_id = canonical_playlist_id(url)
+        channel_id = canonical_channel_id(url)
+        if channel_id or (playlist_id and not video_id):
+            self.ingest_playlist(playlist_id, channel_id)
+            return
+            
         if not video_id:
             QMessageBox.warning(self, "Error", "Invalid YouTube URL format")
             return
             
-        self.status_label.setText("Authenticating with YouTube API...")
-        QApplication.processEvents()
-        
         # Authenticate with YouTube API
-        if not self.youtube:
-            self.youtube, error = self.auth_manager.get_authenticated_service()
-            if error:
-                QMessageBox.critical(self, "Authentication Error", error)
-                return
+        if not self.authenticate():
+            return
                 
         # Fetch video information
         self.status_label.setText("Fetching video information...")
@@ -270,7 +433,8 @@ class YouTubeDataAPIDownloader(QWidget):
                 part="snippet,contentDetails,statistics",
                 id=video_id
             )
-            response = request.execute()
+            with tracer.span("data_api", call="videos.list", video_id=video_id):
+                response = request.execute()
             
             if not response['items']:
                 QMessageBox.warning(self, "Error", "Video not found or is private")
@@ -312,53 +476,23 @@ class YouTubeDataAPIDownloader(QWidget):
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Update video info with thumbnail
-                if 'thumbnail' in info:
-                    self.video_info['thumbnail'] = info['thumbnail']
-                    
-                # Filter and organize formats
-                self.video_formats = []
-                
-                # Add combined formats first (video+audio)
-                for f in info.get('formats', []):
-                    if f.get('vcodec', 'none') != 'none' and f.get('acodec', 'none') != 'none':
-                        format_note = f.get('format_note', '')
-                        file_size = self.format_human_size(f.get('filesize') or f.get('filesize_approx', 0))
-                        resolution = f"{f.get('width', '?')}x{f.get('height', '?')}"
-                        ext = f.get('ext', '?')
-                        
-                        format_name = f"{resolution} - {format_note} ({ext}, {file_size})"
-                        self.video_formats.append({
-                            'format_id': f['format_id'],
-                            'name': format_name,
-                            'quality': f.get('quality', 0)
-                        })
-                
-                # Add best audio only as an option
-                audio_formats = [f for f in info.get('formats', []) if 
-                                f.get('vcodec', '') == 'none' and f.get('acodec', 'none') != 'none']
-                if audio_formats:
-                    best_audio = max(audio_formats, key=lambda x: x.get('quality', 0))
-                    format_name = f"Audio only - {best_audio.get('format_note', '')} ({best_audio.get('ext', '?')})"
-                    self.video_formats.append({
-                        'format_id': best_audio['format_id'],
-                        'name': format_name,
-                        'quality': -1  # Place at the end
-                    })
+                with tracer.span("extract_info", url=url):
+                    info = ydl.extract_info(url, download=False)
                 
-                # Sort formats by quality (highest first)
-                self.video_formats.sort(key=lambda x: x['quality'], reverse=True)
-                
-                # Populate format combo box
-                self.format_combo.clear()
-                for fmt in self.video_formats:
-                    self.format_combo.addItem(fmt['name'])
-                
-                self.format_combo.setEnabled(True)
-                self.download_btn.setEnabled(True)
-                self.status_label.setText("Ready to download")
+            # Keep only compact format records; the raw info dict can be large
+            if 'thumbnail' in info:
+                self.video_info['thumbnail'] = info['thumbnail']
+            self.video_formats = formats_from_info(info)
+            del info
+            
+            # Populate format combo box
+            self.format_combo.clear()
+            for fmt in self.video_formats:
+                self.format_combo.addItem(fmt.display_name)
+            
+            self.format_combo.setEnabled(True)
+            self.download_btn.setEnabled(True)
+            self.status_label.setText("Ready to download")
             
         except googleapiclient.errors.HttpError as e:
             error_content = json.loads(e.content)
@@ -372,10 +506,50 @@ class YouTubeDataAPIDownloader(QWidget):
             
     def format_human_size(self, size):
         """Formats byte size to human readable format"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024 or unit == 'GB':
-                return f"{size:.1f} {unit}"
-            size /= 1024
+        return format_human_size(size)
+            
+    def ingest_playlist(self, playlist_id, channel_id=None):
+        """Download every video of a playlist or of a channel's uploads"""
+        if not self.authenticate():
+            return
+            
+        if channel_id:
+            self.status_label.setText("Looking up channel uploads...")
+            QApplication.processEvents()
+            try:
+                playlist_id = uploads_playlist_id(self.youtube, channel_id)
+            except googleapiclient.errors.HttpError as e:
+                error_message = json.loads(e.content)['error']['message']
+                QMessageBox.critical(self, "YouTube API Error", f"API Error: {error_message}")
+                self.status_label.setText(f"Error: {error_message}")
+                return
+            if not playlist_id:
+                QMessageBox.warning(self, "Error", "Channel not found")
+                return
+                
+        # Ask user for save location
+        save_path = QFileDialog.getExistingDirectory(self, "Select Download Folder")
+        
+        if not save_path:
+            return  # User canceled
+            
+        # Start ingestion thread; downloads begin while later pages are listed
+        self.ingest_thread = PlaylistIngestThread(
+            self.youtube, playlist_id, save_path, store=self.download_store)
+        
+        # Connect signals
+        self.ingest_thread.progress_signal.connect(self.update_progress)
+        self.ingest_thread.finished_signal.connect(self.download_finished)
+        self.ingest_thread.error_signal.connect(self.download_error)
+        
+        # Disable UI elements during download
+        self.download_btn.setEnabled(False)
+        self.url_input.setEnabled(False)
+        self.format_combo.setEnabled(False)
+        
+        # Start the thread
+        self.status_label.setText("Listing playlist...")
+        self.ingest_thread.start()
             
     def start_download(self):
         """Initiate the download process"""
@@ -394,17 +568,30 @@ class YouTubeDataAPIDownloader(QWidget):
         if not save_path:
             return  # User canceled
             
+        # Post-processing stages, tagged with the Data API metadata
+        stages = list(POSTPROCESS_OPTIONS[self.postprocess_combo.currentIndex()][1])
+        if stages:
+            stages.append(("tag", {"metadata": {
+                "title": self.video_info['title'],
+                "artist": self.video_info['channel'],
+            }}))
+            
         # Start download thread
         self.download_thread = VideoDownloadThread(
             self.video_info['url'], 
-            selected_format['format_id'], 
-            save_path
+            selected_format.format_id, 
+            save_path,
+            video_id=self.video_info['id'],
+            store=self.download_store,
+            postprocessor=self.postprocessor,
+            stages=stages
         )
         
         # Connect signals
         self.download_thread.progress_signal.connect(self.update_progress)
         self.download_thread.finished_signal.connect(self.download_finished)
         self.download_thread.error_signal.connect(self.download_error)
+        self.download_thread.postprocess_signal.connect(self.postprocess_finished)
         
         # Disable UI elements during download
         self.download_btn.setEnabled(False)
@@ -432,6 +619,10 @@ class YouTubeDataAPIDownloader(QWidget):
         
         QMessageBox.information(self, "Success", message)
         
+    def postprocess_finished(self, message):
+        """Show the outcome of background post-processing"""
+        self.status_label.setText(message)
+        
     def download_error(self, error_message):
         """Handle download errors"""
         self.status_label.setText(error_message)
@@ -449,4 +640,6 @@ if __name__ == "__main__":
     os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"  # For development only
     window = YouTubeDataAPIDownloader()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    exit_code = app.exec_()
+    window.postprocessor.shutdown()
+    sys.exit(exit_code)
\ No newline at end of file
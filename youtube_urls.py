@@ -0,0 +1,230 @@
+"""
+Canonical video and playlist ids from YouTube URLs.
+
+Run as a script to canonicalize and dedupe URL lists in a single pass:
+
+    python youtube_urls.py urls.txt more_urls.txt > canonical.txt
+    cat urls.txt | python youtube_urls.py --ids
+"""
+import re
+import sys
+import argparse
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+VIDEO = "video"
+PLAYLIST = "playlist"
+
+# Scheme, host and the rest of the URL
+_URL_RE = re.compile(
+    r'\s*(?:https?://)?(?:(?:www|m|music)\.)?'
+    r'(?P<host>youtube\.com|youtube-nocookie\.com|youtu\.be)'
+    r'(?P<path>/[^?#\s]*)?(?:\?(?P<query>[^#\s]*))?',
+    re.IGNORECASE,
+)
+
+# youtu.be/<id>
+_SHORT_PATH_RE = re.compile(r'/(?P<id>[0-9A-Za-z_-]{11})/?')
+
+# youtube.com/{embed,v,e,shorts,live}/<id>; embed/videoseries?list= is a
+# playlist player whose 11-letter name would otherwise pass for a video id
+_ID_PATH_RE = re.compile(r'/(?:embed|v|e|shorts|live)/(?!videoseries\b)(?P<id>[0-9A-Za-z_-]{11})/?')
+
+# youtube.com/channel/<channel id>
+_CHANNEL_PATH_RE = re.compile(r'/channel/(?P<id>UC[0-9A-Za-z_-]{22})/?')
+
+# v= and list= query parameters
+_VIDEO_PARAM_RE = re.compile(r'(?:^|&)v=(?P<id>[0-9A-Za-z_-]{11})(?=&|$)')
+_PLAYLIST_PARAM_RE = re.compile(r'(?:^|&)list=(?P<id>[0-9A-Za-z_-]{12,})(?=&|$)')
+
+
+class CanonicalRef(NamedTuple):
+    """A video or playlist identified by its canonical id."""
+    kind: str
+    id: str
+
+    @property
+    def url(self) -> str:
+        """The canonical URL of the video or playlist."""
+        if self.kind == VIDEO:
+            return f"https://www.youtube.com/watch?v={self.id}"
+        return f"https://www.youtube.com/playlist?list={self.id}"
+
+
+def _split(url: str) -> Optional[Tuple[str, str, str]]:
+    match = _URL_RE.match(url)
+    if not match:
+        return None
+    return match.group('host').lower(), match.group('path') or '', match.group('query') or ''
+
+
+def canonical_video_id(url: str) -> Optional[str]:
+    """
+    Extract the video id from a watch, youtu.be, embed, shorts or live URL.
+
+    Args:
+        url: The URL to parse
+
+    Returns:
+        The 11-character video id, or None if url does not point at a video
+    """
+    parts = _split(url)
+    if parts is None:
+        return None
+
+    host, path, query = parts
+    if host == 'youtu.be':
+        match = _SHORT_PATH_RE.fullmatch(path)
+    elif path in ('/watch', '/watch/'):
+        match = _VIDEO_PARAM_RE.search(query)
+    else:
+        match = _ID_PATH_RE.fullmatch(path)
+    return match.group('id') if match else None
+
+
+def canonical_playlist_id(url: str) -> Optional[str]:
+    """
+    Extract the playlist id from a URL with a list= parameter.
+
+    Args:
+        url: The URL to parse
+
+    Returns:
+        The playlist id, or None if url does not reference a playlist
+    """
+    parts = _split(url)
+    if parts is None:
+        return None
+    match = _PLAYLIST_PARAM_RE.search(parts[2])
+    return match.group('id') if match else None
+
+
+def canonical_channel_id(url: str) -> Optional[str]:
+    """
+    Extract the channel id from a youtube.com/channel/UC... URL.
+
+    Args:
+        url: The URL to parse
+
+    Returns:
+        The channel id, or None if url is not a channel URL
+    """
+    parts = _split(url)
+    if parts is None or parts[0] == 'youtu.be':
+        return None
+    match = _CHANNEL_PATH_RE.fullmatch(parts[1])
+    return match.group('id') if match else None
+
+
+def canonicalize(url: str) -> Optional[CanonicalRef]:
+    """
+    Reduce a URL to the video or playlist it points at.
+
+    URLs naming both a video and a playlist resolve to the video.
+
+    Args:
+        url: The URL to parse
+
+    Returns:
+        The canonical reference, or None if url is not a YouTube video or playlist URL
+    """
+    video_id = canonical_video_id(url)
+    if video_id:
+        return CanonicalRef(VIDEO, video_id)
+    playlist_id = canonical_playlist_id(url)
+    if playlist_id:
+        return CanonicalRef(PLAYLIST, playlist_id)
+    return None
+
+
+class CanonicalizeStats:
+    """Counters filled in by iter_canonical."""
+
+    def __init__(self):
+        self.lines = 0
+        self.unique = 0
+        self.duplicates = 0
+        self.invalid = 0
+
+
+def iter_canonical(
+    lines: Iterable[str], stats: Optional[CanonicalizeStats] = None
+) -> Iterator[CanonicalRef]:
+    """
+    Canonicalize a stream of URLs, yielding each video or playlist once.
+
+    Blank lines and lines starting with # are skipped. Only the set of
+    seen ids is kept in memory, so inputs of any length stream through in
+    a single pass.
+
+    Args:
+        lines: URLs, one per item (e.g. an open file)
+        stats: Counters to update while iterating
+
+    Yields:
+        CanonicalRef for every first occurrence
+    """
+    seen: Set[CanonicalRef] = set()
+    for line in lines:
+        if stats:
+            stats.lines += 1
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        ref = canonicalize(line)
+        if ref is None:
+            if stats:
+                stats.invalid += 1
+            continue
+        if ref in seen:
+            if stats:
+                stats.duplicates += 1
+            continue
+
+        seen.add(ref)
+        if stats:
+            stats.unique += 1
+        yield ref
+
+
+def iter_lines(paths: Iterable[str], stdin: IO[str] = sys.stdin) -> Iterator[str]:
+    """
+    Stream lines from files, reading stdin for "-" or when no paths are given.
+
+    Args:
+        paths: File paths
+        stdin: Stream used for "-"
+
+    Yields:
+        Every line of every input in order
+    """
+    paths = list(paths) or ['-']
+    for path in paths:
+        if path == '-':
+            yield from stdin
+        else:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                yield from f
+
+
+def main(argv=None):
+    """Canonicalize and dedupe URL lists from files or stdin."""
+    parser = argparse.ArgumentParser(description="Canonicalize and dedupe YouTube URL lists.")
+    parser.add_argument('files', nargs='*', help="input files (default: stdin)")
+    parser.add_argument('--ids', action='store_true', help="print kind and id instead of canonical URLs")
+    args = parser.parse_args(argv)
+
+    stats = CanonicalizeStats()
+    out = sys.stdout
+    for ref in iter_canonical(iter_lines(args.files), stats):
+        out.write(f"{ref.kind}\t{ref.id}\n" if args.ids else f"{ref.url}\n")
+
+    print(
+        f"{stats.lines} lines, {stats.unique} unique, "
+        f"{stats.duplicates} duplicates, {stats.invalid} invalid",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()